@@ -0,0 +1,112 @@
+"""
+
+Measures the latency from injecting a pointer motion (XTEST) to the service
+processing it, for both the threaded and the single-threaded glib event loop
+modes. Needs a running X server with the XTEST and RECORD extensions (Xvfb
+will do), and moves the pointer around with the first mouse button held while
+running.
+
+    python benchmarks/event_loop_latency.py [--count 2000] [--interval 2]
+
+Every mode runs in its own subprocess, as both the service and GTK only
+expect to be set up once per process.
+
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def measure(event_loop: str, count: int, interval: float):
+    from Xlib import X
+    from Xlib.display import Display
+    from Xlib.ext import xtest
+
+    from pyxzones.service import Service
+
+    service = Service(event_loop)
+    injected_at = {}
+    latencies = []
+    done = threading.Event()
+
+    process_event = service.process_event
+    def timed_process_event(event):
+        if event.type == X.MotionNotify and (event.root_x, event.root_y) in injected_at:
+            latencies.append(time.perf_counter() - injected_at.pop((event.root_x, event.root_y)))
+            if len(latencies) == count:
+                done.set()
+        process_event(event)
+    service.process_event = timed_process_event
+
+    def inject():
+        display = Display()
+        time.sleep(1)  # let the RECORD context get enabled
+
+        # Motion is only received during drags
+        xtest.fake_input(display, X.ButtonPress, 1)
+        display.sync()
+        time.sleep(0.2)
+
+        for i in range(count):
+            position = (100 + i % 500, 100 + (i // 500) % 500)
+            injected_at[position] = time.perf_counter()
+            xtest.fake_input(display, X.MotionNotify, x=position[0], y=position[1])
+            display.sync()
+            time.sleep(interval / 1000)
+        done.wait(5)
+
+        xtest.fake_input(display, X.ButtonRelease, 1)
+        display.sync()
+
+        # Ends record_enable_context() in the threaded mode, the glib mode
+        # additionally has to leave the main loop
+        display.record_disable_context(service.input_backend.context)
+        display.sync()
+        if event_loop == 'glib':
+            from gi.repository import GLib, Gtk
+            GLib.idle_add(Gtk.main_quit)
+
+    thread = threading.Thread(target=inject)
+    thread.daemon = True
+    thread.start()
+
+    service.listen()
+
+    latencies.sort()
+    print(
+        f"{event_loop:>8}: {len(latencies)}/{count} events, "
+        f"p50 {statistics.median(latencies) * 1e6:.0f} us, "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1e6:.0f} us, "
+        f"max {latencies[-1] * 1e6:.0f} us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=2000)
+    parser.add_argument('--interval', type=float, default=2, help="milliseconds between injected events")
+    parser.add_argument('--event-loop', choices=['threaded', 'glib'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.event_loop:
+        measure(args.event_loop, args.count, args.interval)
+        return
+
+    for event_loop in ('threaded', 'glib'):
+        subprocess.run([
+            sys.executable, __file__,
+            '--count', str(args.count),
+            '--interval', str(args.interval),
+            '--event-loop', event_loop
+        ], check=True)
+
+
+if __name__ == "__main__":
+    main()
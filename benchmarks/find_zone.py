@@ -0,0 +1,84 @@
+"""
+
+Compares ZoneProfile.find_zone (spatial index) against the original linear
+scan over merge zones and zones, on a synthetic six monitor layout.
+
+    python benchmarks/find_zone.py
+
+"""
+
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pyxzones.settings import SETTINGS
+from pyxzones.types import WorkArea
+from pyxzones.zone_profile import ZoneProfile, clear_zone_caches
+
+
+MONITORS = [
+    {"width": 3840, "height": 2160, "x": 0},
+    {"width": 3840, "height": 2160, "x": 3840},
+    {"width": 1440, "height": 2560, "x": 7680},
+    {"width": 3840, "height": 2160, "x": 9120},
+    {"width": 2560, "height": 1440, "x": 12960},
+    {"width": 1440, "height": 2560, "x": 15520},
+]
+
+DISPLAYS = [
+    {"orientation": "landscape", "columns": [10, 20, 20, 20, 20, 10]},
+    {"orientation": "landscape", "columns": [25, 25, 25, 25]},
+    {"orientation": "portrait", "rows": [20, 20, 20, 20, 20]},
+    {"orientation": "landscape", "columns": [10, 80, 10]},
+    {"orientation": "landscape", "columns": [33, 34, 33]},
+    {"orientation": "portrait", "rows": [35, 40, 25]},
+]
+
+
+def linear_find_zone(profile, virtual_desktop, x, y):
+    for zone in profile.merge_zones[virtual_desktop]:
+        if zone.check(x, y):
+            return zone
+    for zone in profile.zones[virtual_desktop]:
+        if zone.check(x, y):
+            return zone
+    return None
+
+
+def build_profile():
+    # Zones are computed from the global settings, so swap in a denser zone
+    # specification for the duration of the benchmark
+    SETTINGS.load({"zones": {"displays": DISPLAYS}})
+    work_areas = [[WorkArea(m["x"], 32, m["width"], m["height"] - 32) for m in MONITORS]]
+    return ZoneProfile.get_zones_per_virtual_desktop(MONITORS, work_areas)
+
+
+def main():
+    profile = build_profile()
+    width = MONITORS[-1]["x"] + MONITORS[-1]["width"]
+    height = max(m["height"] for m in MONITORS)
+
+    random.seed(0)
+    points = [(random.randrange(-10, width + 10), random.randrange(-10, height + 10)) for _ in range(10000)]
+
+    for x, y in points:
+        assert profile.find_zone(0, x, y) == linear_find_zone(profile, 0, x, y), (x, y)
+
+    zone_count = len(profile.zones[0]) + len(profile.merge_zones[0])
+    build = timeit.timeit(lambda: (clear_zone_caches(), build_profile()), number=20) / 20
+    linear = timeit.timeit(lambda: [linear_find_zone(profile, 0, x, y) for x, y in points], number=10)
+    indexed = timeit.timeit(lambda: [profile.find_zone(0, x, y) for x, y in points], number=10)
+    lookups = len(points) * 10
+
+    print(f"zones (incl. merge zones): {zone_count}")
+    print(f"profile build (incl. index): {build * 1e3:.2f} ms")
+    print(f"linear scan: {linear / lookups * 1e9:.0f} ns/lookup")
+    print(f"zone index:  {indexed / lookups * 1e9:.0f} ns/lookup")
+    print(f"speedup:     {linear / indexed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
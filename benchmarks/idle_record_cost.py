@@ -0,0 +1,110 @@
+"""
+
+Measures what idle pointer movement (no button or keybinding held) costs the
+service: CPU time, RECORD wakeups (intercepted batches handed to Python) and
+events parsed, with the drag-gated RECORD ranges against the original
+always-on range (event types 2..8, including MotionNotify). Needs a running X
+server with the XTEST and RECORD extensions (Xvfb will do), and moves the
+pointer around while running.
+
+    python benchmarks/idle_record_cost.py [--seconds 10] [--rate 250]
+
+Every variant runs in its own subprocess, as the service only expects to be
+set up once per process.
+
+"""
+
+import argparse
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def measure(variant: str, seconds: float, rate: int):
+    from Xlib import X
+    from Xlib.display import Display
+    from Xlib.ext import xtest
+
+    from pyxzones.input_backend import RecordInputBackend
+    from pyxzones.service import Service
+
+    if variant == 'always-on':
+        get_record_ranges = RecordInputBackend.get_record_ranges
+        def always_on_record_ranges(self, motion):
+            ranges = get_record_ranges(self, motion)
+            ranges[0]["device_events"] = (X.KeyPress, X.LeaveNotify)
+            return ranges
+        RecordInputBackend.get_record_ranges = always_on_record_ranges
+
+    service = Service()
+    wakeups = 0
+    event_handler = service.event_handler
+    def counting_event_handler(events):
+        nonlocal wakeups
+        wakeups += 1
+        event_handler(events)
+    service.event_handler = counting_event_handler
+
+    usage = {}
+
+    def inject():
+        display = Display()
+        time.sleep(1)  # let the RECORD context get enabled
+        usage['start'] = time.process_time()
+        wakeups_start = wakeups
+        end = time.monotonic() + seconds
+        i = 0
+        while time.monotonic() < end:
+            xtest.fake_input(display, X.MotionNotify, x=100 + i % 800, y=100 + (i // 800) % 600)
+            display.sync()
+            i += 1
+            time.sleep(1 / rate)
+        time.sleep(0.5)
+        usage['cpu'] = time.process_time() - usage['start']
+        usage['wakeups'] = wakeups - wakeups_start
+        usage['injected'] = i
+        # Ends record_enable_context()
+        display.record_disable_context(service.input_backend.context)
+        display.sync()
+
+    thread = threading.Thread(target=inject)
+    thread.daemon = True
+    thread.start()
+
+    service.listen()
+    thread.join()
+
+    print(
+        f"{variant:>11}: {usage['injected']} motions injected over {seconds:.0f} s, "
+        f"{usage['cpu'] / seconds * 100:.2f}% CPU, "
+        f"{usage['wakeups'] / seconds:.1f} wakeups/s, "
+        f"{service.counters['events_received']} events parsed"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--rate', type=int, default=250, help="injected motions per second")
+    parser.add_argument('--variant', choices=['always-on', 'drag-gated'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        measure(args.variant, args.seconds, args.rate)
+        return
+
+    for variant in ('always-on', 'drag-gated'):
+        subprocess.run([
+            sys.executable, __file__,
+            '--seconds', str(args.seconds),
+            '--rate', str(args.rate),
+            '--variant', variant
+        ], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+
+Compares the RECORD and XInput2 input backends side by side: latency from
+injecting a pointer motion (XTEST) to the service processing it, and the CPU
+time spent by the service per event. Needs a running X server with the XTEST,
+RECORD and XInputExtension extensions (Xvfb will do), and moves the pointer
+around with the first mouse button held while running.
+
+    python benchmarks/input_backends.py [--count 2000] [--interval 2]
+
+Every backend runs in its own subprocess, as the service only expects to be
+set up once per process.
+
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def measure(input_backend: str, count: int, interval: float):
+    from Xlib import X
+    from Xlib.display import Display
+    from Xlib.ext import xtest
+
+    from pyxzones.service import Service
+
+    service = Service(input_backend=input_backend)
+    injected_at = {}
+    latencies = []
+    done = threading.Event()
+
+    process_event = service.process_event
+    def timed_process_event(event):
+        if event.type == X.MotionNotify and (event.root_x, event.root_y) in injected_at:
+            latencies.append(time.perf_counter() - injected_at.pop((event.root_x, event.root_y)))
+            if len(latencies) == count:
+                done.set()
+        process_event(event)
+    service.process_event = timed_process_event
+
+    def inject():
+        display = Display()
+        time.sleep(1)  # let the backend get set up
+
+        # Motion is only received during drags
+        xtest.fake_input(display, X.ButtonPress, 1)
+        display.sync()
+        time.sleep(0.2)
+
+        cpu = time.process_time()
+        for i in range(count):
+            position = (100 + i % 500, 100 + (i // 500) % 500)
+            injected_at[position] = time.perf_counter()
+            xtest.fake_input(display, X.MotionNotify, x=position[0], y=position[1])
+            display.sync()
+            time.sleep(interval / 1000)
+        done.wait(5)
+        cpu = time.process_time() - cpu
+
+        xtest.fake_input(display, X.ButtonRelease, 1)
+        display.sync()
+
+        latencies.sort()
+        print(
+            f"{input_backend:>8}: {len(latencies)}/{count} events, "
+            f"p50 {statistics.median(latencies) * 1e6:.0f} us, "
+            f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1e6:.0f} us, "
+            f"max {latencies[-1] * 1e6:.0f} us, "
+            f"{cpu / count * 1e6:.0f} us CPU/event (incl. injection)",
+            flush=True
+        )
+        # Neither backend has a way out of its receiving loop
+        os._exit(0)
+
+    thread = threading.Thread(target=inject)
+    thread.daemon = True
+    thread.start()
+
+    service.listen()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=2000)
+    parser.add_argument('--interval', type=float, default=2, help="milliseconds between injected events")
+    parser.add_argument('--input-backend', choices=['record', 'xinput2'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.input_backend:
+        measure(args.input_backend, args.count, args.interval)
+        return
+
+    for input_backend in ('record', 'xinput2'):
+        subprocess.run([
+            sys.executable, __file__,
+            '--count', str(args.count),
+            '--interval', str(args.interval),
+            '--input-backend', input_backend
+        ], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+
+Measures time-to-first-frame of the zone overlay, from the activating input
+(keybinding held, first mouse button down, then the pointer moving) to the
+overlay being drawn, with and without the persistent_overlay setting.
+Needs a running X server with the XTEST and RECORD extensions (ideally with
+a window manager and compositor, like a real session), and drags on the
+root window with Alt_L held while running.
+
+    python benchmarks/overlay_first_frame.py [--repeat 20]
+
+Every mode runs in its own subprocess, as the service and GTK only expect
+to be set up once per process.
+
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def measure(mode: str, repeat: int):
+    from Xlib import X, XK
+    from Xlib.display import Display
+    from Xlib.ext import xtest
+
+    from pyxzones.service import Service
+    from pyxzones.settings import SETTINGS
+    from pyxzones.zone_display import ZoneDisplay
+
+    SETTINGS.load({"keybindings": ["Alt_L"], "persistent_overlay": mode == 'persistent'})
+
+    activated_at = None
+    latencies = []
+    frame = threading.Event()
+
+    frame_drawn = ZoneDisplay.frame_drawn
+    def timed_frame_drawn(self):
+        if self.activated_at is not None and activated_at is not None:
+            latencies.append(time.perf_counter() - activated_at)
+            frame.set()
+        frame_drawn(self)
+    ZoneDisplay.frame_drawn = timed_frame_drawn
+
+    service = Service()
+
+    def inject():
+        nonlocal activated_at
+        display = Display()
+        alt = display.keysym_to_keycode(XK.XK_Alt_L)
+        time.sleep(1)  # let the service get set up
+
+        for _ in range(repeat):
+            frame.clear()
+            xtest.fake_input(display, X.MotionNotify, x=200, y=200)
+            xtest.fake_input(display, X.KeyPress, alt)
+            xtest.fake_input(display, X.ButtonPress, 1)
+            display.sync()
+            time.sleep(0.05)
+
+            # Zones are only shown once the drag actually moves
+            activated_at = time.perf_counter()
+            xtest.fake_input(display, X.MotionNotify, x=220, y=220)
+            display.sync()
+            frame.wait(2)
+            activated_at = None
+
+            # Releasing the key first, so nothing gets snapped
+            xtest.fake_input(display, X.KeyRelease, alt)
+            xtest.fake_input(display, X.ButtonRelease, 1)
+            display.sync()
+            time.sleep(0.2)
+
+        print(
+            f"{mode:>10}: {len(latencies)}/{repeat} activations, "
+            f"first frame p50 {statistics.median(latencies) * 1e3:.1f} ms, "
+            f"max {max(latencies) * 1e3:.1f} ms",
+            flush=True
+        )
+        # The service has no way out of its receiving loop
+        os._exit(0)
+
+    thread = threading.Thread(target=inject)
+    thread.daemon = True
+    thread.start()
+
+    service.listen()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--mode', choices=['mapped', 'persistent'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        measure(args.mode, args.repeat)
+        return
+
+    for mode in ('mapped', 'persistent'):
+        subprocess.run([sys.executable, __file__, '--repeat', str(args.repeat), '--mode', mode], check=True)
+
+
+if __name__ == "__main__":
+    main()
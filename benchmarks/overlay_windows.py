@@ -0,0 +1,95 @@
+"""
+
+Compares the per work area (monitor) overlay windows against a single
+overlay window spanning the whole screen, the way the zone display used to
+be set up: memory held by the rendered overlay surfaces, window pixels to be
+composited, and latency from show() to every shown window having drawn.
+Needs a running X server (ideally with a compositor, like a real session)
+and the same dependencies as the service itself.
+
+    python benchmarks/overlay_windows.py [--repeat 20]
+
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk
+
+from pyxzones.service import get_zone_profile
+from pyxzones.types import WorkArea
+from pyxzones.xewmh import XEWMH
+from pyxzones.zone_display import ZoneDisplay
+
+
+def surface_bytes(surface) -> int:
+    return surface.get_stride() * surface.get_height()
+
+
+def iterate_main_loop(until, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not until() and time.monotonic() < deadline:
+        Gtk.main_iteration_do(False)
+
+
+def measure(name: str, work_areas: list[WorkArea], zones, repeat: int):
+    zone_display = ZoneDisplay(work_areas, zones)
+    iterate_main_loop(lambda: not Gtk.events_pending())
+
+    memory = 0
+    for window in zone_display.windows:
+        surfaces = window.get_zone_surfaces(*window.get_render_key())
+        memory += surface_bytes(surfaces.overlay)
+        memory += sum(surface_bytes(tile) for tile, _, _ in surfaces.hover_tiles.values())
+    pixels = sum(window.size[0] * window.size[1] for window in zone_display.windows if window.zones)
+
+    drawn = set()
+    for window in zone_display.windows:
+        window.connect_after("draw", lambda window, cr: drawn.add(window))
+    shown = [window for window in zone_display.windows if window.zones]
+
+    latencies = []
+    for _ in range(repeat):
+        drawn.clear()
+        start = time.perf_counter()
+        zone_display.show()
+        iterate_main_loop(lambda: len(drawn) == len(shown))
+        latencies.append(time.perf_counter() - start)
+        zone_display.hide()
+        iterate_main_loop(lambda: not Gtk.events_pending())
+
+    for window in zone_display.windows:
+        window.destroy()
+
+    print(
+        f"{name:<22} {len(shown)} window(s), {pixels / 1e6:6.2f} Mpx, "
+        f"surfaces {memory / 2**20:7.1f} MiB, "
+        f"show p50 {statistics.median(latencies) * 1e3:6.1f} ms, max {max(latencies) * 1e3:6.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    ewmh = XEWMH()
+    ewmh.internAtoms()
+    zone_profile = get_zone_profile(ewmh)
+    desktop = ewmh.getShowingDesktop()
+    zones = zone_profile.zones[desktop]
+    geometry = ewmh.root.get_geometry()
+
+    measure("single screen window", [WorkArea(0, 0, geometry.width, geometry.height)], zones, args.repeat)
+    measure("per work area windows", zone_profile.work_areas[desktop], zones, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+
+Compares decode_record_data (memoryview and struct, InputEvent records)
+against the original per event Xlib parsing of intercepted RECORD data, on
+synthetic replies of core key, button and motion events in wire format.
+
+    python benchmarks/record_decoder.py
+
+"""
+
+import random
+import struct
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from Xlib import X
+from Xlib.protocol import event, rq
+
+from pyxzones.input_backend import decode_record_data
+
+
+class Display:
+    # Just enough of a display for Xlib to parse events with
+    event_classes = event.event_class.copy()
+
+    def get_resource_class(self, class_name, default=None):
+        return default
+
+
+def xlib_decode(data, display):
+    events = []
+    while len(data):
+        event, data = rq.EventField(None).parse_binary_value(data, display, None, None)
+        events.append(event)
+    return events
+
+
+def build_reply(count: int) -> bytes:
+    # A drag: a button press, motion with the odd key event, a button release
+    events = [(X.ButtonPress, X.Button1)]
+    for i in range(count - 2):
+        events.append(random.choice(((X.KeyPress, 64), (X.KeyRelease, 64))) if i % 50 == 49 else (X.MotionNotify, 0))
+    events.append((X.ButtonRelease, X.Button1))
+
+    return b''.join(
+        struct.pack(
+            '=BBHIIIIhhhhHBx',
+            event_type, detail, 0, i, 0x100, 0x100, 0,
+            random.randrange(4000), random.randrange(2000), 0, 0, 0, 1
+        )
+        for i, (event_type, detail) in enumerate(events)
+    )
+
+
+def main():
+    random.seed(0)
+    display = Display()
+
+    for size in (1, 16, 256, 4096):
+        data = build_reply(max(size, 2))
+        count = len(data) // 32
+
+        expected = [(e.type, e.detail, e.root_x, e.root_y) for e in xlib_decode(data, display)]
+        assert [(e.type, e.detail, e.root_x, e.root_y) for e in decode_record_data(data, display)] == expected
+
+        number = max(1, 20000 // count)
+        xlib = timeit.timeit(lambda: xlib_decode(data, display), number=number)
+        fast = timeit.timeit(lambda: decode_record_data(data, display), number=number)
+        events = count * number
+
+        print(f"{count:>5} events/reply: xlib {events / xlib / 1e3:8.0f} k events/s, "
+              f"decoder {events / fast / 1e3:8.0f} k events/s, speedup {xlib / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+
+Replays a session log (pyxzones --record-session FILE) through
+Service.event_handler, without an X server: X is replaced by a fake XEWMH
+with a single stub window, the zone display by stubs counting invalidations
+(one per work area, like the real overlay windows), and the zone profile is
+rebuilt from the monitors and work areas recorded in the log (with the
+current user configuration). Snapping runs through the real snap_window()
+against the fake XEWMH, which only collects the decisions.
+
+    python benchmarks/replay_session.py FILE [--repeat 5] [--realtime]
+
+By default events are replayed as fast as possible (deterministic as long as
+motion_coalescing_interval is 0), --realtime keeps the recorded spacing.
+Needs the same dependencies as the service itself, as it imports it.
+
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from Xlib.protocol import event
+
+from pyxzones import config
+from pyxzones.config import SETTINGS_FILE
+from pyxzones.input_backend import decode_record_data
+from pyxzones.scheduler import DebounceScheduler
+from pyxzones.service import Service
+from pyxzones.session_log import read_session_header, read_session_records
+from pyxzones.settings import SETTINGS
+from pyxzones.types import WorkArea, Zone
+from pyxzones.zone_layout import get_damage_padding, get_damaged_zones, get_zone_area, split_zones
+from pyxzones.zone_profile import ZoneProfile
+
+
+class FakeDisplay:
+    # Just enough of a display for Xlib to parse (non input) events with
+    event_classes = event.event_class.copy()
+
+    def __init__(self, header: dict):
+        self.min_keycode = header["min_keycode"]
+        self.keysyms = header["keysyms"]
+
+    def get_resource_class(self, class_name, default=None):
+        return default
+
+    def keycode_to_keysym(self, keycode, index):
+        offset = keycode - self.min_keycode
+        return self.keysyms[offset] if 0 <= offset < len(self.keysyms) else 0
+
+    def flush(self):
+        pass
+
+
+class FakeWindow:
+    def get_geometry(self):
+        return SimpleNamespace(x=0, y=0, width=800, height=600)
+
+
+class FakeXEWMH:
+    def __init__(self, header: dict):
+        self.display = FakeDisplay(header)
+        self.window = FakeWindow()
+        self.snaps = []
+
+    def getActiveWindow(self):
+        return self.window
+
+    def getWmName(self, window):
+        return b'replay'
+
+    def getWindowCoordinates(self, window):
+        return (0, 0)
+
+    def getWindowFrameExtents(self, window):
+        return [0, 0, 0, 0]
+
+    def setMoveResizeWindow(self, window, x, y, w, h):
+        self.snaps.append((x, y, w, h))
+
+    def setWmState(self, window, action, state):
+        pass
+
+
+class FakeZoneWindow:
+    # One per work area, like ZoneDisplayWindow, counting redraws
+    def __init__(self, work_area: WorkArea):
+        self.origin = (work_area.x, work_area.y)
+        self.invalidated_areas = 0
+
+    def redraw_area(self, x, y, width, height):
+        self.invalidated_areas += 1
+
+
+class FakeZoneDisplay:
+    # Same zone split and damage areas as ZoneDisplay (through the same
+    # zone_layout helpers), without any drawing
+    def __init__(self, zones, work_areas: list[WorkArea]):
+        self.hover_zone = None
+        self.windows: list[FakeZoneWindow] = []
+        self.zone_windows: dict[Zone, FakeZoneWindow] = {}
+        self.damage_padding = get_damage_padding(SETTINGS.snapshot)
+        self.set_zones(zones, work_areas)
+
+    @property
+    def invalidated_areas(self) -> int:
+        return sum(window.invalidated_areas for window in self.windows)
+
+    def set_zones(self, zones, work_areas: list[WorkArea]):
+        self.windows = [FakeZoneWindow(work_area) for work_area in work_areas]
+        self.zone_windows = {}
+        for window, window_zones in zip(self.windows, split_zones(zones, work_areas)):
+            self.zone_windows.update(dict.fromkeys(window_zones, window))
+
+    def set_hover_zone(self, zone):
+        # (window, window relative (x, y, width, height)) damage areas
+        damaged_zones = get_damaged_zones(self.hover_zone, zone)
+        self.hover_zone = zone
+
+        damaged_areas = []
+        for damaged_zone in damaged_zones:
+            window = self.zone_windows.get(damaged_zone)
+            if window:
+                damaged_areas.append((window, get_zone_area(damaged_zone, window.origin, self.damage_padding)))
+        return damaged_areas
+
+    def show(self, activated_at=None):
+        pass
+
+    def hide(self):
+        pass
+
+
+class FakeInputBackend:
+    def __init__(self):
+        self.motion = False
+
+    def set_motion(self, motion):
+        self.motion = motion
+
+
+def build_service(header: dict) -> Service:
+    # Service.__init__ talks to X, so only the state process_event() works
+    # with is set up here
+    service = Service.__new__(Service)
+    service.event_loop = 'glib'  # main loop calls are made directly
+    service.ewmh = FakeXEWMH(header)
+    service.input_backend = FakeInputBackend()
+    service.snap_tracker = None
+    service.scheduler = DebounceScheduler()  # flushes held back motion
+
+    work_areas = [[WorkArea(*work_area) for work_area in desktop] for desktop in header["work_areas"]]
+    service.zone_profile = ZoneProfile.get_zones_per_virtual_desktop(header["monitors"], work_areas)
+    service.current_virtual_desktop = header["current_virtual_desktop"]
+    service.zone_display = FakeZoneDisplay(
+        service.zone_profile.zones[service.current_virtual_desktop],
+        service.zone_profile.work_areas[service.current_virtual_desktop]
+    )
+
+    service.setup_input_state()
+    return service
+
+
+def replay(header: dict, records: list[tuple[int, bytes]], realtime: bool) -> dict:
+    service = build_service(header)
+
+    latencies = []
+    process_event = service.process_event
+    def timed_process_event(event):
+        start = time.perf_counter()
+        process_event(event)
+        latencies.append(time.perf_counter() - start)
+    service.process_event = timed_process_event
+
+    start = time.perf_counter()
+    first_timestamp = records[0][0] if records else 0
+    for timestamp, data in records:
+        if realtime:
+            delay = (timestamp - first_timestamp) / 1e9 - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        service.event_handler(decode_record_data(data, service.ewmh.display))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "elapsed": elapsed,
+        "latencies": sorted(latencies),
+        "counters": service.counters,
+        "invalidated_areas": service.zone_display.invalidated_areas,
+        "snaps": service.ewmh.snaps,
+    }
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('file', type=Path)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--realtime', action='store_true')
+    args = parser.parse_args()
+
+    config_file = config.get_config_file_path(SETTINGS_FILE)
+    if config_file is not None:
+        with config_file.open() as file:
+            SETTINGS.load_from_file(file)
+
+    with args.file.open('rb') as file:
+        header = read_session_header(file)
+        records = list(read_session_records(file))
+
+    results = [replay(header, records, args.realtime) for _ in range(args.repeat)]
+    # Every run makes the same decisions, only the timings differ
+    result = min(results, key=lambda result: result["elapsed"])
+    latencies = result["latencies"]
+    counters = result["counters"]
+
+    print(f"replies:                {len(records)}")
+    print(f"events received:        {counters['events_received']}")
+    print(f"events processed:       {counters['events_processed']}")
+    print(f"events/sec:             {counters['events_received'] / result['elapsed']:.0f} (best of {args.repeat})")
+    if latencies:
+        print(f"process_event p50:      {percentile(latencies, 0.5) * 1e6:.1f} us")
+        print(f"process_event p90:      {percentile(latencies, 0.9) * 1e6:.1f} us")
+        print(f"process_event p99:      {percentile(latencies, 0.99) * 1e6:.1f} us")
+        print(f"process_event max:      {latencies[-1] * 1e6:.1f} us")
+    print(f"overlay invalidations:  {counters['overlay_invalidations']} ({result['invalidated_areas']} areas)")
+    print(f"motion switches:        {counters['motion_subscription_switches']}")
+    print(f"snap decisions:         {len(result['snaps'])}")
+    for x, y, w, h in result["snaps"]:
+        print(f"    {w}x{h}+{x}+{y}")
+
+
+if __name__ == "__main__":
+    main()
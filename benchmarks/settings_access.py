@@ -0,0 +1,74 @@
+"""
+
+Per-access cost of the settings read on every event, comparing the original
+dynamic Settings.__getattribute__ lookup against the compiled snapshot.
+
+    python benchmarks/settings_access.py
+
+"""
+
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pyxzones.settings import Settings
+
+
+class DynamicSettings:
+    # The original lookup mechanism, trimmed to the fields read per event
+
+    def __init__(self, user_configuration):
+        self.user_configuration = user_configuration
+
+    def __getattribute__(self, name):
+        if name != 'user_configuration' and self.user_configuration and name in self.user_configuration:
+            return self.user_configuration[name]
+        return super().__getattribute__(name)
+
+    @property
+    def highlight_hover_zone(self):
+        return True
+
+    @property
+    def snap_basis_point(self):
+        return 'cursor'
+
+    @property
+    def zone_border_color(self):
+        return (0.4, 0.4, 0.8, 0.8)
+
+    @property
+    def zones(self):
+        return {"displays": [{"orientation": "landscape", "columns": [10, 80, 10]}]}
+
+
+def main():
+    example = Path(__file__).resolve().parents[1] / 'example_config' / 'pyxzones.json'
+    with example.open() as file:
+        user_configuration = json.load(file)
+    # Leave a field to fall through to the default, as is typical
+    del user_configuration['snap_basis_point']
+
+    dynamic = DynamicSettings(user_configuration)
+    compiled = Settings()
+    compiled.load(user_configuration)
+    snapshot = compiled.snapshot
+
+    number = 1_000_000
+    for name in ('highlight_hover_zone', 'snap_basis_point', 'zones'):
+        cases = {
+            "dynamic __getattribute__": (dynamic, f"settings.{name}"),
+            "SETTINGS property": (compiled, f"settings.{name}"),
+            "SETTINGS.snapshot": (snapshot, f"settings.{name}"),
+        }
+        print(f"{name}:")
+        for label, (settings, statement) in cases.items():
+            seconds = timeit.timeit(statement, globals={"settings": settings}, number=number)
+            print(f"  {label:<26} {seconds / number * 1e9:7.1f} ns/access")
+
+
+if __name__ == "__main__":
+    main()
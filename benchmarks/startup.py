@@ -0,0 +1,121 @@
+"""
+
+Measures startup time and memory for each overlay_loading mode:
+
+  - import time (python -X importtime) of the modules the service needs up
+    front, against those only loaded with the overlay (GTK, cairo)
+  - time to construct the service (ready to listen) and the resident set
+    size at that point, then again once the overlay has been loaded
+
+Needs a running X server with the RECORD extension for the second part.
+
+    python benchmarks/startup.py [--repeat 5] [--top 10]
+
+Every measurement runs in its own subprocess, so nothing is imported yet.
+
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+ROOT = Path(__file__).resolve().parents[1]
+MODES = ('startup', 'background', 'first_use')
+
+
+def get_rss_kb() -> int:
+    with open('/proc/self/status') as file:
+        for line in file:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def measure_imports(module: str) -> tuple[int, list[tuple[int, str]]]:
+    # Cumulative microseconds importing the module, and (cumulative
+    # microseconds, name) of each of its direct imports, from the -X importtime
+    # report (which lists every module after the ones it imported, nested by
+    # indentation)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, int(cumulative), name.strip()))
+
+    index = max(index for index, (depth, _, name) in enumerate(entries) if depth == 0 and name == module)
+    imports = []
+    for depth, cumulative, name in reversed(entries[:index]):
+        if depth == 0:
+            break
+        if depth == 1:
+            imports.append((cumulative, name))
+    return entries[index][1], imports
+
+
+def measure_service(mode: str) -> dict:
+    # Runs in a subprocess, see main()
+    start = time.perf_counter()
+    from pyxzones.service import Service
+    from pyxzones.settings import SETTINGS
+
+    SETTINGS.load({"overlay_loading": mode})
+    service = Service()
+    ready = time.perf_counter() - start
+    ready_rss = get_rss_kb()
+
+    service.load_zone_display()
+    loaded = time.perf_counter() - start
+    return {"ready": ready, "ready_rss": ready_rss, "loaded": loaded, "loaded_rss": get_rss_kb()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--measure', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure_service(args.measure)))
+        return
+
+    for module in ("pyxzones.service", "pyxzones.zone_display"):
+        totals = []
+        for _ in range(args.repeat):
+            total, imports = measure_imports(module)
+            totals.append(total)
+        print(f"import {module:<24} {statistics.median(totals) / 1000:8.1f} ms (median of {args.repeat}), heaviest:")
+        for cumulative, name in sorted(imports, reverse=True)[:args.top]:
+            print(f"    {name:<32} {cumulative / 1000:8.1f} ms")
+
+    print()
+    print(f"{'overlay_loading':<16} {'ready':>10} {'rss':>10} {'overlay':>10} {'rss':>10}")
+    for mode in MODES:
+        results = []
+        for _ in range(args.repeat):
+            output = subprocess.run(
+                [sys.executable, __file__, '--measure', mode],
+                capture_output=True, text=True, check=True
+            ).stdout
+            results.append(json.loads(output.splitlines()[-1]))
+        ready = statistics.median(result["ready"] for result in results)
+        loaded = statistics.median(result["loaded"] for result in results)
+        ready_rss = statistics.median(result["ready_rss"] for result in results)
+        loaded_rss = statistics.median(result["loaded_rss"] for result in results)
+        print(f"{mode:<16} {ready * 1000:>7.1f} ms {ready_rss / 1024:>7.1f} MB {loaded * 1000:>7.1f} ms {loaded_rss / 1024:>7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
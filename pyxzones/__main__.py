@@ -2,13 +2,14 @@ import argparse
 import logging
 import sys
 from json.decoder import JSONDecodeError
+from pathlib import Path
 
-from .settings import SETTINGS
+from .config import SETTINGS_FILE
+from .settings import SETTINGS, SettingsError
 from . import config
+from . import control
 from . import process
 
-SETTINGS_FILE = 'pyxzones.json'
-
 
 def main():
     parser = argparse.ArgumentParser(
@@ -25,6 +26,30 @@ def main():
         help='kill any running instance of pyxzones and exit',
         action="store_true"
     )
+    parser.add_argument(
+        '--event-loop',
+        choices=['threaded', 'glib'],
+        default='threaded',
+        help="'threaded' runs input, property events and drawing on separate threads, "
+             "'glib' runs them all from a single GLib main loop"
+    )
+    parser.add_argument(
+        '--input-backend',
+        choices=['record', 'xinput2'],
+        default='record',
+        help="X extension used to follow keyboard and mouse input"
+    )
+    parser.add_argument(
+        '--record-session',
+        metavar='FILE',
+        type=Path,
+        help="write the intercepted input to FILE, for replaying offline (record input backend only)"
+    )
+    parser.add_argument(
+        '--timings',
+        action='store_true',
+        help="print how long each startup stage took, and whether the zone layout came from the cache (warm) or was computed (cold)"
+    )
     parser.add_argument(
         '--log-level',
         choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'FATAL'],
@@ -32,8 +57,45 @@ def main():
         type=str.upper,
         help=argparse.SUPPRESS
     )
+    subparsers = parser.add_subparsers(dest='command', metavar='COMMAND')
+    ctl_parser = subparsers.add_parser(
+        'ctl',
+        help='control the running instance',
+        description='Control the running instance through its control socket'
+    )
+    ctl_parser.add_argument(
+        'request',
+        choices=control.COMMANDS,
+        help="'reload' the configuration, print 'stats' or the current zones ('dump-zones'), "
+             "'pause' or 'resume' event processing, or 'profile' it (start or stop)"
+    )
+    ctl_parser.add_argument(
+        'action',
+        nargs='?',
+        choices=['start', 'stop'],
+        help="for 'profile'"
+    )
+    ctl_parser.add_argument(
+        '--output',
+        metavar='FILE',
+        type=Path,
+        help="with 'profile stop', also write the raw profile (pstats format) to FILE"
+    )
     args = parser.parse_args()
 
+    if args.command == 'ctl':
+        if (args.request == 'profile') != (args.action is not None):
+            ctl_parser.error("'start' or 'stop' is required with, and only with, 'profile'")
+        request = {"command": args.request}
+        if args.action:
+            request["action"] = args.action
+        if args.output:
+            request["output"] = str(args.output.resolve())
+        sys.exit(control.run_client(request))
+
+    if args.record_session and args.input_backend != 'record':
+        parser.error("--record-session requires the record input backend")
+
     log_level = logging.getLevelName(args.log_level)
     logging.basicConfig(
         level=log_level,
@@ -48,13 +110,16 @@ def main():
             except JSONDecodeError:
                 logging.fatal(f"Failed to parse user configuration json file located at {config_file}")
                 sys.exit(1)
+            except SettingsError as exception:
+                logging.fatal(f"Invalid user configuration in {config_file}: {exception}")
+                sys.exit(1)
 
     if args.daemon:
-        process.launch_daemon()
+        process.launch_daemon(args.event_loop, args.input_backend, args.record_session, args.timings)
     elif args.kill:
         process.kill_daemon()
     else:
-        process.start()
+        process.start(args.event_loop, args.input_backend, args.record_session, args.timings)
 
 
 if __name__ == "__main__":
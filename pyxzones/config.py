@@ -12,6 +12,8 @@ https://specifications.freedesktop.org/basedir-spec/0.8/
 
 """
 
+SETTINGS_FILE = 'pyxzones.json'
+
 
 def get_config_file_path(filename: str) -> Path | None:
     xdg_config_home = xdg.xdg_config_home()
@@ -75,3 +77,12 @@ def get_data_directory_path() -> Path | None:
                 logging.warning(f"Failed to create an XDG_DATA_DIR at {data_dir}")
 
     return None
+
+
+def get_runtime_directory_path() -> Path | None:
+    # For sockets and the like, falling back to the data directory where
+    # XDG_RUNTIME_DIR isn't set
+    xdg_runtime_dir = xdg.xdg_runtime_dir()
+    if xdg_runtime_dir is not None and xdg_runtime_dir.is_dir():
+        return xdg_runtime_dir
+    return get_data_directory_path()
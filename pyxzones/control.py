@@ -0,0 +1,207 @@
+import json
+import logging
+import os
+import socket
+import threading
+from pathlib import Path
+
+from . import config
+from .config import SETTINGS_FILE
+from .settings import SettingsError, SettingsSnapshot
+
+"""
+
+Control socket of a running instance (pyxzones ctl ...)
+
+A Unix domain stream socket in the XDG runtime directory (or the data
+directory without one), readable and writable by the user only. Requests and
+responses are single lines of json:
+
+    {"command": "stats"}
+    {"ok": true, "counters": {...}, ...}
+
+    {"command": "profile", "action": "stop", "output": "/tmp/pyxzones.prof"}
+    {"ok": false, "error": "not profiling"}
+
+Commands run on the control thread, which only ever hands work to the event
+processing (flags it checks, or tasks on the scheduler), so a slow or stuck
+client never holds up input.
+
+"""
+
+SOCKET_FILE = 'pyxzones.sock'
+
+# Seconds a connected client has to send each request
+CLIENT_TIMEOUT = 5
+
+COMMANDS = ('reload', 'stats', 'dump-zones', 'pause', 'resume', 'profile')
+
+
+class ControlError(Exception):
+    pass
+
+
+def get_socket_path() -> Path | None:
+    runtime_directory = config.get_runtime_directory_path()
+    return Path(runtime_directory, SOCKET_FILE) if runtime_directory is not None else None
+
+
+def load_settings_snapshot() -> SettingsSnapshot:
+    # The user configuration compiled afresh, without applying it
+    config_file = config.get_config_file_path(SETTINGS_FILE)
+    if config_file is None:
+        return SettingsSnapshot()
+    try:
+        with config_file.open() as file:
+            return SettingsSnapshot.compile(json.load(file))
+    except json.JSONDecodeError as exception:
+        raise ControlError(f"Failed to parse {config_file}: {exception}")
+    except SettingsError as exception:
+        raise ControlError(f"Invalid user configuration in {config_file}: {exception}")
+
+
+class ControlServer:
+    def __init__(self, service, path: Path):
+        self.service = service
+        self.path = path
+        self.socket = None
+        self.handlers = {
+            'reload': self.reload,
+            'stats': self.stats,
+            'dump-zones': self.dump_zones,
+            'pause': self.pause,
+            'resume': self.resume,
+            'profile': self.profile,
+        }
+
+    def start(self) -> bool:
+        # A socket file left behind by an instance that's no longer running
+        # is replaced, one still accepting connections is left alone
+        if self.path.exists():
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                    probe.connect(str(self.path))
+                logging.warning(f"Another instance is listening on {self.path}, control socket disabled")
+                return False
+            except OSError:
+                self.path.unlink(missing_ok=True)
+
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            self.socket.bind(str(self.path))
+        finally:
+            os.umask(old_umask)
+        self.socket.listen()
+        logging.debug(f"Control socket listening on {self.path}")
+
+        thread = threading.Thread(target=self.serve, name="pyxzones-control")
+        thread.daemon = True
+        thread.start()
+        return True
+
+    def serve(self):
+        while True:
+            connection, _ = self.socket.accept()
+            with connection:
+                try:
+                    self.handle_connection(connection)
+                except OSError as exception:
+                    logging.debug(f"Control connection closed: {exception!r}")
+
+    def handle_connection(self, connection: socket.socket):
+        connection.settimeout(CLIENT_TIMEOUT)
+        with connection.makefile('rwb') as file:
+            for line in file:
+                file.write(json.dumps(self.dispatch(line), separators=(',', ':')).encode() + b'\n')
+                file.flush()
+
+    def dispatch(self, line: bytes) -> dict:
+        try:
+            request = json.loads(line)
+            if type(request) is not dict:
+                raise ControlError("request must be a json object")
+            handler = self.handlers.get(request.get('command'))
+            if handler is None:
+                raise ControlError(f"unknown command {request.get('command')!r}, expected one of {', '.join(COMMANDS)}")
+            return {"ok": True, **handler(request)}
+        except json.JSONDecodeError as exception:
+            return {"ok": False, "error": f"malformed request: {exception}"}
+        except ControlError as exception:
+            return {"ok": False, "error": str(exception)}
+        except Exception as exception:
+            logging.exception(f"Control request failed: {exception}")
+            return {"ok": False, "error": repr(exception)}
+
+    def reload(self, request: dict) -> dict:
+        # Zones, keybindings and overlay styling apply straight away, settings
+        # deciding how the service is set up (event loop, overlay mode,
+        # snap tracking, ...) on the next start
+        self.service.reload_settings(load_settings_snapshot())
+        return {}
+
+    def stats(self, request: dict) -> dict:
+        return self.service.get_stats()
+
+    def dump_zones(self, request: dict) -> dict:
+        return self.service.get_zones()
+
+    def pause(self, request: dict) -> dict:
+        self.service.paused = True
+        return {"paused": True}
+
+    def resume(self, request: dict) -> dict:
+        self.service.paused = False
+        return {"paused": False}
+
+    def profile(self, request: dict) -> dict:
+        action = request.get('action')
+        if action == 'start':
+            if not self.service.start_profiling():
+                raise ControlError("already profiling")
+            return {}
+        if action == 'stop':
+            output = request.get('output')
+            report = self.service.stop_profiling(Path(output) if output else None)
+            if report is None:
+                raise ControlError("not profiling")
+            return {"text": report}
+        raise ControlError(f"profile action must be 'start' or 'stop', not {action!r}")
+
+
+def send_request(request: dict, timeout: float = 10) -> dict:
+    path = get_socket_path()
+    if path is None or not path.exists():
+        raise ControlError("No running instance found")
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        try:
+            connection.connect(str(path))
+        except (ConnectionRefusedError, FileNotFoundError):
+            raise ControlError("No running instance found")
+        connection.sendall(json.dumps(request).encode() + b'\n')
+        with connection.makefile('rb') as file:
+            line = file.readline()
+
+    if not line:
+        raise ControlError("Connection closed without a response")
+    return json.loads(line)
+
+
+def run_client(request: dict) -> int:
+    # Prints the response, returning the process exit code
+    try:
+        response = send_request(request)
+    except (ControlError, OSError) as exception:
+        print(exception)
+        return 1
+
+    if not response.pop('ok', False):
+        print(f"Error: {response.get('error')}")
+        return 1
+    if 'text' in response:
+        print(response['text'])
+    elif response:
+        print(json.dumps(response, indent=2))
+    return 0
@@ -0,0 +1,301 @@
+import logging
+import struct
+from abc import ABC, abstractmethod
+from typing import Callable
+from Xlib import X
+from Xlib.display import Display
+from Xlib.ext import record, xinput
+from Xlib.ext.ge import GenericEventCode
+from Xlib.protocol import rq
+
+from .metrics import timed
+from .session_log import SessionRecorder
+
+
+class InputEvent:
+    """
+    Core input event reduced to the fields the service looks at, for
+    backends that don't receive (or don't need to build) full Xlib events
+    """
+
+    __slots__ = ('type', 'detail', 'root_x', 'root_y')
+
+    def __init__(self, type: int, detail: int, root_x: int, root_y: int):
+        self.type = type
+        self.detail = detail
+        self.root_x = root_x
+        self.root_y = root_y
+
+    def __repr__(self):
+        return f"InputEvent(type={self.type}, detail={self.detail}, root_x={self.root_x}, root_y={self.root_y})"
+
+
+# Core KeyPress, KeyRelease, ButtonPress, ButtonRelease and MotionNotify events
+# share the same layout: type (CARD8), detail (CARD8), sequence (CARD16),
+# time, root, event, child (CARD32 each), root_x, root_y (INT16 each), ...
+CORE_INPUT_EVENT_TYPES = frozenset((X.KeyPress, X.KeyRelease, X.ButtonPress, X.ButtonRelease, X.MotionNotify))
+CORE_INPUT_EVENT = struct.Struct('=BB18xhh')
+EVENT_SIZE = 32
+
+
+@timed('record_decode')
+def decode_record_data(data: bytes, display) -> list:
+    """
+    Splits intercepted RECORD data into events
+
+    The core input events are unpacked straight off a memoryview of the data
+    into InputEvent records, anything else is left to Xlib
+    """
+    view = memoryview(data)
+    unpack_from = CORE_INPUT_EVENT.unpack_from
+    events = []
+
+    for offset in range(0, len(view) - EVENT_SIZE + 1, EVENT_SIZE):
+        # The top bit flags events from SendEvent
+        event_type = view[offset] & 0x7f
+        if event_type in CORE_INPUT_EVENT_TYPES:
+            _, detail, root_x, root_y = unpack_from(view, offset)
+            events.append(InputEvent(event_type, detail, root_x, root_y))
+        else:
+            event, _ = rq.EventField(None).parse_binary_value(
+                bytes(view[offset:offset + EVENT_SIZE]), display, None, None
+            )
+            events.append(event)
+
+    return events
+
+
+class InputBackend(ABC):
+    """
+    Source of the key, button and pointer motion events driving the service
+
+    Events are handed over in batches to the handler, from whichever thread
+    runs the backend: run() blocks receiving events (threaded event loop),
+    while watch() adds a GLib source for them and returns (glib event loop).
+
+    Key and button events are always delivered, pointer motion only after
+    set_motion(True), as it's only of interest during drags.
+    """
+
+    # X extension the backend depends on
+    extension: str = None
+
+    def __init__(self, handler: Callable[[list], None], control_display: Display):
+        self.handler = handler
+        self.control_display = control_display
+        self.motion = False
+
+    @abstractmethod
+    def set_motion(self, motion: bool):
+        pass
+
+    @abstractmethod
+    def run(self):
+        pass
+
+    @abstractmethod
+    def watch(self):
+        pass
+
+
+class RecordInputBackend(InputBackend):
+    """
+    Intercepts the device events of every client through the RECORD extension
+    """
+
+    extension = 'RECORD'
+
+    def __init__(self, handler: Callable[[list], None], control_display: Display):
+        super().__init__(handler, control_display)
+
+        # Not sure why this needs its own Display but display-referencing behavior
+        # becomes somewhat unpredictable without it
+        self.record_display = Display()
+        self.context = self.record_display.record_create_context(
+            0,
+            [record.AllClients],
+            self.get_record_ranges(self.motion),
+        )
+
+        # Every reply is also written here when recording the session
+        self.session_recorder: SessionRecorder | None = None
+
+    def get_record_ranges(self, motion: bool) -> list[dict]:
+        # device_events is an inclusive range of event types: key and button
+        # presses and releases, extended up to MotionNotify only while motion
+        # matters, so idle pointer movement is never sent over at all
+        return [
+            {
+                "core_requests": (0, 0),
+                "core_replies": (0, 0),
+                "ext_requests": (0, 0, 0, 0),
+                "ext_replies": (0, 0, 0, 0),
+                "delivered_events": (0, 0),
+                "device_events": (X.KeyPress, X.MotionNotify if motion else X.ButtonRelease),
+                "errors": (0, 0),
+                "client_started": False,
+                "client_died": False,
+            }
+        ]
+
+    def set_motion(self, motion: bool):
+        self.motion = motion
+
+        # The recording connection is busy receiving the intercepted data, so
+        # the enabled context is re-targeted from the control connection instead
+        #
+        # Registering clients already in the context replaces their ranges
+        # within that one request, so there is no window (as there would be
+        # between an unregister and a register) where key and button events,
+        # a ButtonRelease ending a drag most of all, go unrecorded
+        display = self.control_display
+        display.record_register_clients(self.context, 0, [record.AllClients], self.get_record_ranges(motion))
+        display.flush()
+
+    def on_reply(self, reply):
+        if self.session_recorder and reply.data:
+            self.session_recorder.write(reply.data)
+
+        events = decode_record_data(reply.data, self.record_display.display)
+        if events:
+            self.handler(events)
+
+    def run(self):
+        self.record_display.record_enable_context(self.context, self.on_reply)
+        self.record_display.record_free_context(self.context)
+
+    def watch(self):
+        # Same as record_enable_context(), without blocking on the replies:
+        # the RECORD connection is watched from the GLib main loop instead
+        from gi.repository import GLib
+
+        display = self.record_display.display
+        record.EnableContext(
+            callback=self.on_reply,
+            display=display,
+            opcode=self.record_display.get_extension_major(record.extname),
+            context=self.context,
+            defer=True
+        )
+        display.flush()
+
+        def on_readable(source, condition):
+            display.pending_events()
+            return True
+
+        GLib.io_add_watch(display.fileno(), GLib.PRIORITY_HIGH, GLib.IO_IN, on_readable)
+
+
+class XInput2InputBackend(InputBackend):
+    """
+    Selects XInput2 raw device events on the root window
+
+    Unlike RECORD, this only needs a regular client connection and event
+    selection, but raw events carry no pointer position, which is queried
+    (once per batch) for button and motion events instead. Button numbers
+    are the physical ones, before any pointer button mapping.
+    """
+
+    extension = xinput.extname
+
+    # Raw event type -> core event type
+    RAW_EVENT_TYPES = {
+        xinput.RawKeyPress: X.KeyPress,
+        xinput.RawKeyRelease: X.KeyRelease,
+        xinput.RawButtonPress: X.ButtonPress,
+        xinput.RawButtonRelease: X.ButtonRelease,
+        xinput.RawMotion: X.MotionNotify,
+    }
+
+    # Raw events are not parsed by Xlib, leaving everything past the generic
+    # event header as is: deviceid (CARD16), time (CARD32), detail (CARD32), ...
+    RAW_EVENT_DETAIL = struct.Struct('=I')
+    RAW_EVENT_DETAIL_OFFSET = 6
+
+    def __init__(self, handler: Callable[[list], None], control_display: Display):
+        super().__init__(handler, control_display)
+
+        self.display = Display()
+        self.root = self.display.screen().root
+        self.opcode = self.display.get_extension_major(xinput.extname)
+
+        # XInput 2.1 is needed for raw events to keep coming while another
+        # client (generally, the WM moving a window) grabs the pointer
+        version = xinput.XIQueryVersion(
+            display=self.display.display,
+            opcode=self.opcode,
+            major_version=2,
+            minor_version=2
+        )
+        if (version.major_version, version.minor_version) < (2, 1):
+            logging.warning(f"XInput {version.major_version}.{version.minor_version} found, raw events will pause during pointer grabs")
+
+        self.select_events()
+
+    def select_events(self):
+        mask = xinput.RawKeyPressMask | xinput.RawKeyReleaseMask | xinput.RawButtonPressMask | xinput.RawButtonReleaseMask
+        if self.motion:
+            mask |= xinput.RawMotionMask
+        self.root.xinput_select_events([(xinput.AllMasterDevices, mask)])
+        self.display.flush()
+
+    def set_motion(self, motion: bool):
+        # Selections are per client, so this has to go through the backend's own
+        # connection, which is fine as the handler is always called from the
+        # thread receiving its events
+        self.motion = motion
+        self.select_events()
+
+    def translate_events(self, raw_events) -> list[InputEvent]:
+        events = []
+        pointer = None
+        for raw_event in raw_events:
+            if raw_event.type != GenericEventCode or raw_event.extension != self.opcode:
+                continue
+            event_type = self.RAW_EVENT_TYPES.get(raw_event.evtype)
+            if event_type is None:
+                continue
+
+            detail, = self.RAW_EVENT_DETAIL.unpack_from(raw_event.data, self.RAW_EVENT_DETAIL_OFFSET)
+            if event_type in (X.KeyPress, X.KeyRelease):
+                events.append(InputEvent(event_type, detail, 0, 0))
+                continue
+
+            if pointer is None:
+                pointer = self.root.query_pointer()
+            events.append(InputEvent(event_type, detail, pointer.root_x, pointer.root_y))
+        return events
+
+    def receive_pending(self, raw_events: list):
+        # Events can queue up while the pointer is queried, so keep going
+        # until the queue stays empty (nothing would wake the GLib watch for
+        # events already read off the socket)
+        while True:
+            while self.display.pending_events():
+                raw_events.append(self.display.next_event())
+            if not raw_events:
+                return
+
+            events = self.translate_events(raw_events)
+            if events:
+                self.handler(events)
+            raw_events = []
+
+    def run(self):
+        while True:
+            self.receive_pending([self.display.next_event()])
+
+    def watch(self):
+        from gi.repository import GLib
+
+        def on_readable(source, condition):
+            self.receive_pending([])
+            return True
+
+        GLib.io_add_watch(self.display.fileno(), GLib.PRIORITY_HIGH, GLib.IO_IN, on_readable)
+
+
+INPUT_BACKENDS: dict[str, type[InputBackend]] = {
+    'record': RecordInputBackend,
+    'xinput2': XInput2InputBackend,
+}
@@ -0,0 +1,138 @@
+import os
+import signal
+import sys
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter_ns
+from typing import Callable
+
+"""
+
+Stage timing histograms for the input to overlay/snap pipeline, enabled by
+setting PYXZONES_METRICS=1 in the environment
+
+When disabled, timed() hands back the function it decorates untouched, so the
+instrumentation costs nothing at all (beyond the decoration at import time).
+When enabled, every call costs two perf_counter_ns() calls and a bisect.
+
+Histograms are dumped to stderr on SIGUSR1, along with any other sections
+added through add_dump_section().
+
+"""
+
+ENABLED = os.environ.get('PYXZONES_METRICS', '') not in ('', '0')
+
+# Bucket upper bounds, in microseconds (anything slower lands in a last,
+# unbounded bucket)
+BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000, 250_000)
+BUCKET_BOUNDS_NS = tuple(int(bound * 1000) for bound in BUCKETS)
+
+
+class Histogram:
+    # Updated from several threads without locking, at worst a concurrent
+    # update gets lost, which doesn't matter for these statistics
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, duration_ns: int):
+        self.counts[bisect_left(BUCKET_BOUNDS_NS, duration_ns)] += 1
+        self.count += 1
+        self.total += duration_ns
+        if duration_ns > self.max:
+            self.max = duration_ns
+
+    def percentile(self, fraction: float) -> float | None:
+        # Upper bound (in microseconds) of the bucket the percentile falls in,
+        # capped to the maximum seen
+        if not self.count:
+            return None
+        threshold = self.count * fraction
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= threshold:
+                return min(BUCKETS[index], self.max / 1000) if index < len(BUCKETS) else self.max / 1000
+        return self.max / 1000
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count / 1000 if self.count else None,
+            "p50_us": self.percentile(0.5),
+            "p90_us": self.percentile(0.9),
+            "p99_us": self.percentile(0.99),
+            "max_us": self.max / 1000,
+            "buckets_us": dict(zip([*map(str, BUCKETS), "inf"], self.counts)),
+        }
+
+
+HISTOGRAMS: dict[str, Histogram] = {}
+
+# Functions formatting further sections of the SIGUSR1 dump
+DUMP_SECTIONS: list[Callable[[], str]] = []
+
+
+def timed(stage: str):
+    def decorator(function):
+        if not ENABLED:
+            return function
+
+        histogram = HISTOGRAMS.setdefault(stage, Histogram())
+
+        @wraps(function)
+        def timed_function(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.add(perf_counter_ns() - start)
+
+        return timed_function
+
+    return decorator
+
+
+def record(stage: str, seconds: float):
+    # For durations not spanning a single call, see timed()
+    if ENABLED:
+        HISTOGRAMS.setdefault(stage, Histogram()).add(int(seconds * 1e9))
+
+
+def get_metrics() -> dict[str, dict]:
+    return {stage: histogram.to_dict() for stage, histogram in HISTOGRAMS.items()}
+
+
+def format_metrics() -> str:
+    if not ENABLED:
+        return "Stage timing is disabled, set PYXZONES_METRICS=1 to enable it"
+
+    lines = [f"{'stage':<24} {'count':>8} {'mean':>10} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>10}  (us, percentiles are bucket bounds)"]
+    for stage, histogram in HISTOGRAMS.items():
+        metrics = histogram.to_dict()
+        if not histogram.count:
+            lines.append(f"{stage:<24} {0:>8}")
+            continue
+        lines.append(
+            f"{stage:<24} {metrics['count']:>8} {metrics['mean_us']:>10.1f} {metrics['p50_us']:>8g} "
+            f"{metrics['p90_us']:>8g} {metrics['p99_us']:>8g} {metrics['max_us']:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def add_dump_section(format_section: Callable[[], str]):
+    DUMP_SECTIONS.append(format_section)
+
+
+def install_dump_signal_handler():
+    # Python signal handlers run on the main thread, in the glib event loop
+    # mode that is once the main loop next calls back into Python (any X event)
+    def dump(signum, frame):
+        sections = [format_metrics(), *(format_section() for format_section in DUMP_SECTIONS)]
+        print("\n\n".join(sections), file=sys.stderr, flush=True)
+
+    signal.signal(signal.SIGUSR1, dump)
@@ -6,6 +6,7 @@ from pathlib import Path
 
 from .service import Service, FatalXQueryFailure
 from . import config
+from . import metrics
 
 PID_FILE = 'pyxzones.pid'
 
@@ -48,9 +49,12 @@ def save_stored_pid(pid: int) -> bool:
         return False
 
 
-def start() -> None:
+def start(event_loop: str = 'threaded', input_backend: str = 'record', record_session: Path | None = None, timings: bool = False) -> None:
+    metrics.install_dump_signal_handler()
     try:
-        service = Service()
+        service = Service(event_loop, input_backend, record_session)
+        if timings:
+            print(service.format_startup_timings(), file=sys.stderr, flush=True)
         service.listen()
     except FatalXQueryFailure as exception:
         logging.critical(exception)
@@ -60,7 +64,7 @@ def start() -> None:
         sys.exit(0)
 
 
-def launch_daemon() -> None:
+def launch_daemon(event_loop: str = 'threaded', input_backend: str = 'record', record_session: Path | None = None, timings: bool = False) -> None:
     pid = get_stored_pid()
     if check_pid_running(pid):
         print("Found existing process, terminating...")
@@ -78,7 +82,7 @@ def launch_daemon() -> None:
     save_stored_pid(pid)
     logging.debug(f"Started process: {pid}")
 
-    start()
+    start(event_loop, input_backend, record_session, timings)
 
 
 def kill_daemon() -> None:
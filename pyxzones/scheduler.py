@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Hashable
+
+
+class DebounceScheduler:
+    """
+    Runs keyed, trailing-edge debounced tasks on a single long-lived thread
+
+    Scheduling a key that is already pending pushes its deadline back and
+    replaces its task, so a burst of events runs the task once, the given
+    delay after the last of them. Tasks are called with a context (generally,
+    an X connection) created once on the worker thread and reused, and
+    recreated only after a task fails.
+    """
+
+    def __init__(self, context_factory: Callable[[], Any] | None = None):
+        self.context_factory = context_factory
+        self.context = None
+        self.pending: dict[Hashable, tuple[float, Callable[[Any], None]]] = {}
+        self.condition = threading.Condition()
+        self.counters = Counter()
+
+        thread = threading.Thread(target=self.run, name="pyxzones-scheduler")
+        thread.daemon = True
+        thread.start()
+
+    def schedule(self, key: Hashable, delay: float, task: Callable[[Any], None]):
+        with self.condition:
+            if key in self.pending:
+                self.counters[f"{key}_coalesced"] += 1
+            self.counters[f"{key}_scheduled"] += 1
+            self.pending[key] = (time.monotonic() + delay, task)
+            self.condition.notify()
+
+    def cancel(self, key: Hashable):
+        with self.condition:
+            self.pending.pop(key, None)
+
+    def next_due(self) -> tuple[Hashable, Callable[[Any], None]]:
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                if self.pending:
+                    key, (deadline, task) = min(self.pending.items(), key=lambda item: item[1][0])
+                    if deadline <= now:
+                        del self.pending[key]
+                        return key, task
+                    self.condition.wait(deadline - now)
+                else:
+                    self.condition.wait()
+
+    def run(self):
+        while True:
+            key, task = self.next_due()
+            try:
+                if self.context is None and self.context_factory:
+                    self.context = self.context_factory()
+                task(self.context)
+                self.counters[f"{key}_run"] += 1
+            except Exception as exception:
+                logging.exception(f"Scheduled task {key!r} failed: {exception}")
+                self.counters[f"{key}_failed"] += 1
+                self.context = None
+
+
+class GLibDebounceScheduler:
+    """
+    DebounceScheduler for the GLib event loop mode, tasks run on the main
+    loop thread as GLib timeout sources rather than on a worker thread
+    """
+
+    def __init__(self, context_factory: Callable[[], Any] | None = None):
+        from gi.repository import GLib
+        self.GLib = GLib
+
+        self.context_factory = context_factory
+        self.context = None
+        self.pending: dict[Hashable, int] = {}  # key -> GLib source id
+        self.counters = Counter()
+
+    def schedule(self, key: Hashable, delay: float, task: Callable[[Any], None]):
+        if key in self.pending:
+            self.counters[f"{key}_coalesced"] += 1
+            self.GLib.source_remove(self.pending[key])
+        self.counters[f"{key}_scheduled"] += 1
+        self.pending[key] = self.GLib.timeout_add(int(delay * 1000), self.run, key, task)
+
+    def cancel(self, key: Hashable):
+        if key in self.pending:
+            self.GLib.source_remove(self.pending.pop(key))
+
+    def run(self, key: Hashable, task: Callable[[Any], None]) -> bool:
+        del self.pending[key]
+        try:
+            if self.context is None and self.context_factory:
+                self.context = self.context_factory()
+            task(self.context)
+            self.counters[f"{key}_run"] += 1
+        except Exception as exception:
+            logging.exception(f"Scheduled task {key!r} failed: {exception}")
+            self.counters[f"{key}_failed"] += 1
+            self.context = None
+        return False  # one-shot source
@@ -1,17 +1,29 @@
+import cProfile
+import io
 import logging
+import pstats
 import threading
-from dataclasses import dataclass
-from gi.repository import GLib
-from Xlib import X, XK
-from Xlib.display import Display
-from Xlib.ext import record
-from Xlib.protocol import rq
+import time
+from collections import Counter
+from dataclasses import astuple
+from functools import cached_property, partial
+from pathlib import Path
+from typing import Callable
+from Xlib import X
 from Xlib.xobject.drawable import Window
 
-from .settings import SETTINGS
+from . import metrics
+from . import xq
+from . import zone_cache
+from .control import ControlServer, get_socket_path
+from .input_backend import INPUT_BACKENDS
+from .metrics import timed
+from .scheduler import DebounceScheduler, GLibDebounceScheduler
+from .session_log import SessionRecorder
+from .settings import SETTINGS, SettingsSnapshot
 from .snap import snap_window
+from .snap_tracker import SnapTracker
 from .xewmh import XEWMH
-from .zone_display import setup_zone_display
 from .zone_profile import ZoneProfile
 
 
@@ -40,53 +52,244 @@ def get_zone_profile(ewmh):
     if len(monitors) != len(work_areas[0]):
         logging.info("Operating on single virtual display work area")
 
-    return ZoneProfile.get_zones_per_virtual_desktop(monitors, work_areas)
+    # Monitors and work areas seen before come with their zones already
+    # computed, see zone_cache
+    zone_profile = zone_cache.load_zone_profile(monitors, work_areas)
+    if zone_profile is None:
+        zone_profile = ZoneProfile.get_zones_per_virtual_desktop(monitors, work_areas)
+    zone_cache.save_zone_profile(zone_profile)
+    return zone_profile
+
+
+def refresh_zone_profile(ewmh, zone_profile, desktops: set[int | None]):
+    # Only the desktops whose work areas changed are refetched and recomputed,
+    # None marks a change that couldn't be narrowed down to a desktop
+    #
+    # Every desktop changing at once is most likely a monitor being added,
+    # removed or reconfigured, which needs monitors re-queried regardless
+    number_of_desktops = len(zone_profile.zones)
+    if None in desktops or len(desktops) >= number_of_desktops or max(desktops) >= number_of_desktops:
+        return get_zone_profile(ewmh)
+
+    desktops = sorted(desktops)
+    logging.debug(f"Refreshing zones for desktops {desktops}")
+    work_areas = ewmh.getWorkAreasForVirtualDesktops(desktops)
+    zone_profile = zone_profile.with_desktops(dict(zip(desktops, work_areas)))
+    zone_cache.save_zone_profile(zone_profile)
+    return zone_profile
 
 
 class Service:
-    def __init__(self) -> None:
+    def __init__(self, event_loop: str = 'threaded', input_backend: str = 'record', record_session: Path | None = None) -> None:
+        # 'threaded': input, property events and GTK each run on their own thread
+        # 'glib': everything is driven from the GLib main loop on one thread
+        self.event_loop = event_loop
+        self.input_backend_type = INPUT_BACKENDS[input_backend]
+        self.record_session = record_session
+
+        # (stage, seconds) making up the startup, see format_startup_timings()
+        self.startup_timings: list[tuple[str, float]] = []
+        stage_start = time.perf_counter()
+        def end_stage(stage: str):
+            nonlocal stage_start
+            now = time.perf_counter()
+            self.startup_timings.append((stage, now - stage_start))
+            stage_start = now
+
         self.ewmh = XEWMH()
 
         if not self.ewmh.display.has_extension("RANDR"):
             raise FatalXQueryFailure("X server does not have the required RANDR extension")
 
-        if not self.ewmh.display.has_extension("RECORD"):
-            raise FatalXQueryFailure("X server does not have the required RECORD extension")
-
-        self.zone_profile = get_zone_profile(self.ewmh)
-        self.current_virtual_desktop = self.ewmh.getShowingDesktop()
+        if not self.ewmh.display.has_extension(self.input_backend_type.extension):
+            raise FatalXQueryFailure(f"X server does not have the {self.input_backend_type.extension} extension required by the {input_backend} input backend")
 
-        logging.debug(f"  setup_zone_display():")
-        logging.debug(f"\t{self.current_virtual_desktop=}")
-        logging.debug(f"\t{self.zone_profile.zones[self.current_virtual_desktop]=}")
+        self.ewmh.internAtoms()
+        end_stage("connect")
 
-        geometry = self.ewmh.root.get_geometry()
-        self.zone_window = setup_zone_display(
-            geometry.width, geometry.height,
-            self.zone_profile.zones[self.current_virtual_desktop]
-        )
+        # The zones last used get the overlay up without waiting on any
+        # monitor or work area queries, they're verified in the background
+        # once everything is running
+        self.current_virtual_desktop = self.ewmh.getShowingDesktop()
+        self.zone_profile = zone_cache.load_latest_zone_profile()
+        self.zone_profile_cached = self.zone_profile is not None and self.current_virtual_desktop < len(self.zone_profile.zones)
+        if not self.zone_profile_cached:
+            self.zone_profile = get_zone_profile(self.ewmh)
+        end_stage("zone profile")
+
+        # GTK and the overlay windows are loaded here, or once listening, see
+        # load_zone_display()
+        self.zone_display = None
+        self.zone_display_lock = threading.Lock()
+        if SETTINGS.overlay_loading == 'startup':
+            self.load_zone_display()
+            end_stage("zone display")
+
+        self.setup_input_state()
+
+        # Debounces the refreshes triggered by property changes, all on one
+        # thread sharing one X connection
+        if self.event_loop == 'glib':
+            self.scheduler = GLibDebounceScheduler(context_factory=XEWMH)
+        else:
+            self.scheduler = DebounceScheduler(context_factory=XEWMH)
 
+        self.setup_property_change_monitor()
+        end_stage("property monitor")
+
+        if self.zone_profile_cached:
+            self.scheduler.schedule('zone_cache_verify', 0, self.zone_cache_verification_task)
+
+
+    def zone_cache_verification_task(self, ewmh):
+        # Scheduler task, replacing the cached zone profile used at startup if
+        # the monitors or work areas have changed since it was saved
+        start = time.perf_counter()
+        zone_profile = get_zone_profile(ewmh)
+        logging.debug(f"Verified cached zone layout in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        stale = (zone_profile.zones, zone_profile.merge_zones) != (self.zone_profile.zones, self.zone_profile.merge_zones)
+        self.zone_profile = zone_profile
+        if stale:
+            logging.info("Cached zone layout is out of date, updating")
+            self.update_zone_display(prerender=True)
+
+
+    def load_zone_display(self):
+        # GTK (imported through zone_display) and the overlay windows make up
+        # most of the startup time and memory, so unless overlay_loading is
+        # 'startup' this only runs once listening, in the background or when
+        # the zones are first shown, whichever comes first
+        with self.zone_display_lock:
+            if self.zone_display is not None:
+                return self.zone_display
+
+            start = time.perf_counter()
+            from gi.repository import GLib
+            from .zone_display import setup_zone_display
+            self.GLib = GLib
+
+            zone_profile = self.zone_profile
+            current_virtual_desktop = self.current_virtual_desktop
+
+            logging.debug(f"  setup_zone_display():")
+            logging.debug(f"\t{current_virtual_desktop=}")
+            logging.debug(f"\t{zone_profile.zones[current_virtual_desktop]=}")
+
+            zone_display = setup_zone_display(
+                zone_profile.work_areas[current_virtual_desktop],
+                zone_profile.zones[current_virtual_desktop],
+                threaded=self.event_loop == 'threaded',
+                persistent=SETTINGS.persistent_overlay
+            )
+            zone_display.prerender(zone_profile.zones, zone_profile.work_areas)
+            self.zone_display = zone_display
+            logging.debug(f"Loaded zone display in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        # Refreshes made while loading had no zone display to update yet
+        if (self.zone_profile, self.current_virtual_desktop) != (zone_profile, current_virtual_desktop):
+            self.update_zone_display(prerender=self.zone_profile is not zone_profile)
+        return zone_display
+
+    def format_startup_timings(self) -> str:
+        mode = "warm, cached zone layout" if self.zone_profile_cached else "cold, computed zone layout"
+        lines = [f"startup ({mode}):"]
+        for stage, seconds in self.startup_timings:
+            lines.append(f"  {stage:<20} {seconds * 1000:>8.1f} ms")
+        lines.append(f"  {'total':<20} {sum(seconds for _, seconds in self.startup_timings) * 1000:>8.1f} ms")
+        return "\n".join(lines)
+
+
+    def setup_input_state(self):
+        # Everything process_event() works with, besides X, the zone profile
+        # and the zone display
         self.active_window = None
+        self.window_state = None
         self.mouse_button_down = False
         self.last_active_window_position = None
         self.active_window_has_moved = False
         self.zones_shown = False
-        self.active_keys = { XK.string_to_keysym(key): False for key in SETTINGS.keybindings }
+        self.active_keys = { keysym: False for keysym in SETTINGS.keybinding_keysyms }
         self.active_keys_down = False # effectively a cache of all(self.active_keys.values())
-        self.active_keys_quick_shift = { XK.string_to_keysym(key): False for key in SETTINGS.keybinding_quick_shift }
-        
+        self.active_keys_quick_shift = { keysym: False for keysym in SETTINGS.keybinding_quick_shift_keysyms }
+
+        # Motion held back by the coalescing interval, see coalesce_events()
+        self.pending_motion_event = None
+        self.last_motion_time = 0.0
+        self.event_lock = threading.Lock()
+        self.counters = Counter()
+
+        # Set from the control socket, see control.ControlServer
+        self.paused = False
+        self.profiler: cProfile.Profile | None = None
+        self.profiler_lock = threading.Lock()
 
-        self.setup_property_change_monitor()
+
+    def run_in_main_loop(self, function, *args):
+        # GTK calls are handed over to the GTK thread, unless running the glib
+        # event loop where everything is already on it
+        if self.event_loop == 'glib':
+            function(*args)
+        else:
+            self.GLib.idle_add(function, *args)
+
+
+    def update_zone_display(self, prerender=False):
+        # Overlay windows follow the current desktop's work areas, so they may
+        # be moved, resized, added or removed
+        if self.zone_display is None:
+            return
+        zones = self.zone_profile.zones[self.current_virtual_desktop]
+        work_areas = self.zone_profile.work_areas[self.current_virtual_desktop]
+        self.run_in_main_loop(self.zone_display.set_zones, zones, work_areas)
+        if prerender:
+            self.run_in_main_loop(self.zone_display.prerender, self.zone_profile.zones, self.zone_profile.work_areas)
 
 
     def setup_property_change_monitor(self):
-        thread = threading.Thread(target=self.property_change_event_handler)
+        ewmh = XEWMH()
+
+        # Snapped windows are followed on this connection as well
+        settings = SETTINGS.snapshot
+        self.snap_tracker = None
+        if settings.snap_latency_tracking:
+            self.snap_tracker = SnapTracker(ewmh.display, self.scheduler, settings.snap_latency_timeout / 1000)
+            metrics.add_dump_section(self.snap_tracker.format_stats)
+
+        handle_event = self.property_change_event_handler(ewmh)
+        ewmh.display.flush()
+
+        if self.event_loop == 'glib':
+            from gi.repository import GLib
+            def receive_pending():
+                # Keeps going until the queue stays empty, as events already
+                # read off the socket would not wake the watch again
+                while ewmh.display.pending_events():
+                    handle_event(ewmh.display.next_event())
+
+            def on_readable(source, condition):
+                receive_pending()
+                return True
+            GLib.io_add_watch(ewmh.display.fileno(), GLib.PRIORITY_DEFAULT, GLib.IO_IN, on_readable)
+
+            if self.snap_tracker:
+                # The sync in SnapTracker.track() runs outside of the watch, and
+                # can read events off the socket into the queue as well
+                def on_idle():
+                    receive_pending()
+                    return False
+                self.snap_tracker.on_sync = lambda: GLib.idle_add(on_idle)
+            return
+
+        def monitor():
+            while True:
+                handle_event(ewmh.display.next_event())
+
+        thread = threading.Thread(target=monitor)
         thread.daemon=True
         thread.start()
 
-    def property_change_event_handler(self):
-        local = threading.local()
-        local.ewmh = XEWMH()
+    def property_change_event_handler(self, ewmh):
 
         """
         This below enables monitoring of xrandr events around display status
@@ -96,15 +299,15 @@ class Service:
         Leaving in as a reference.
 
         from Xlib.ext import randr
-        randr.select_input(local.ewmh.root,
+        randr.select_input(ewmh.root,
             randr.RRScreenChangeNotifyMask | randr.RRCrtcChangeNotifyMask |
             randr.RROutputChangeNotifyMask | randr.RROutputPropertyNotifyMask
         )
         """
-        local.ewmh.root.change_attributes(event_mask=X.PropertyChangeMask)
-
-        update_desktop_timer = None
-        zone_refresh_timer = None
+        # SubstructureNotify keeps the coordinate resolver's cached frame
+        # positions current (see xq.WindowCoordinateResolver)
+        ewmh.root.change_attributes(event_mask=X.PropertyChangeMask | X.SubstructureNotifyMask)
+        self.ewmh.coordinate_resolver.tracking = True
 
         logging.debug("Beginning X.PropertyChanged event monitor")
 
@@ -113,73 +316,151 @@ class Service:
         #
         # Given that, hopefully it's unlikely there will be any race conditions
         # arising from this that will require the addition of locking
-        def virtual_desktop_updater_task():
-            self.current_virtual_desktop = XEWMH().getShowingDesktop()
-            self.zone_window.set_zones(self.zone_profile.zones[self.current_virtual_desktop])
-            GLib.idle_add(self.zone_window.reset_position)
-
-        def zone_refresh_task():
-            self.zone_profile = get_zone_profile(XEWMH())
-            self.zone_window.set_zones(self.zone_profile.zones[self.current_virtual_desktop])
-            GLib.idle_add(self.zone_window.reset_position)
+        def virtual_desktop_updater_task(ewmh):
+            self.current_virtual_desktop = ewmh.getShowingDesktop()
+            self.update_zone_display()
+
+        # Desktops with changed work areas, see refresh_zone_profile()
+        changed_desktops = set()
+
+        def zone_refresh_task(ewmh):
+            desktops = changed_desktops.copy()
+            changed_desktops.difference_update(desktops)
+            try:
+                self.zone_profile = refresh_zone_profile(ewmh, self.zone_profile, desktops)
+            except Exception:
+                # Retried with the next work area change (the scheduler logs
+                # the failure)
+                changed_desktops.update(desktops)
+                raise
+            self.update_zone_display(prerender=True)
+
+
+        def on_current_desktop_changed():
+            logging.debug(f"Virtual desktop changed, scheduling task to update state")
+            self.scheduler.schedule('desktop_update', SETTINGS.desktop_change_delay / 1000, virtual_desktop_updater_task)
+
+        def on_work_areas_changed(desktop: int | None):
+            changed_desktops.add(desktop)
+            logging.debug(f"Work areas changed, scheduling task to update known work areas and zones")
+            self.scheduler.schedule('zone_refresh', SETTINGS.work_area_change_delay / 1000, zone_refresh_task)
+
+        def on_net_work_area_changed():
+            # Only when work areas come from _NET_WORKAREA, otherwise the per
+            # desktop properties will have changed as well
+            if xq.WORK_AREA_TIER >= xq.WORK_AREA_TIERS.index('_NET_WORKAREA'):
+                on_work_areas_changed(None)
+
+        def on_number_of_desktops_changed():
+            nonlocal property_handlers
+            property_handlers = get_property_handlers(ewmh.getNumberOfDesktops())
+            on_work_areas_changed(None)
 
+        """
+        Events of interest:
 
-        while True:
-            event = local.ewmh.display.next_event()
+            _NET_CURRENT_DESKTOP triggered for virtual desktop change
 
-            if event.type != X.PropertyNotify:
-                continue
+            _GTK_WORKAREAS_D# for each virtual desktop are all triggered when changed
+                this includes adding/removing panels, adding or removing displays
 
-            """
-            Events of interest:
+            _NET_WORKAREA triggered after _GTK_WORKAREAS_D#
 
-                _NET_CURRENT_DESKTOP triggered for virtual desktop change
+            _NET_NUMBER_OF_DESKTOPS triggered when virtual desktops are added or removed
 
-                _GTK_WORKAREAS_D# for each virtual desktop are all triggered when changed
-                    this includes adding/removing panels, adding or removing displays
-                
-                _NET_WORKAREA triggered after _GTK_WORKAREAS_D#
+        Every watched atom is interned up front and dispatched on by number, so
+        root property churn from anything else (panels, clocks, the active
+        window, ...) is dropped without any X traffic.
+        """
+        def get_property_handlers(number_of_desktops: int) -> dict[int, Callable[[], None]]:
+            handlers = {
+                '_NET_CURRENT_DESKTOP': on_current_desktop_changed,
+                '_NET_NUMBER_OF_DESKTOPS': on_number_of_desktops_changed,
+                '_NET_WORKAREA': on_net_work_area_changed,
+            }
+            for desktop in range(number_of_desktops):
+                handlers[f"_GTK_WORKAREAS_D{desktop}"] = partial(on_work_areas_changed, desktop)
+                handlers[f"_NET_WORKAREAS_D{desktop}"] = partial(on_work_areas_changed, desktop)
+
+            atoms = xq.intern_atoms(ewmh.display, list(handlers))
+            return dict(zip(atoms, handlers.values()))
+
+        property_handlers = get_property_handlers(ewmh.getNumberOfDesktops())
+
+        def handle_event(event):
+            if event.type in (X.ConfigureNotify, X.ReparentNotify, X.DestroyNotify):
+                # Events from root's children, unless selected by the snap tracker
+                # on the (client) window itself
+                if event.event.id != ewmh.root.id:
+                    if self.snap_tracker:
+                        self.snap_tracker.handle_event(event)
+                    return
+                self.ewmh.coordinate_resolver.handle_event(event)
+                return
 
-            """
-            event_name = local.ewmh.display.get_atom_name(event.atom)
+            if event.type != X.PropertyNotify:
+                return
 
-            if event_name == '_NET_CURRENT_DESKTOP':
-                if update_desktop_timer and update_desktop_timer.is_alive():
-                    update_desktop_timer.cancel()
-                logging.debug(f"Virtual desktop changed, scheduling task to update state")
-                update_desktop_timer = threading.Timer(0.2, virtual_desktop_updater_task)
-                update_desktop_timer.start()
+            handler = property_handlers.get(event.atom)
+            if handler:
+                handler()
 
-            if event_name.startswith('_GTK_WORKAREAS_D') or event_name.startswith('_NET_WORKAREAS_D') or event_name == '_NET_WORKAREA':
-                if zone_refresh_timer and zone_refresh_timer.is_alive():
-                    zone_refresh_timer.cancel()
-                logging.debug(f"Work areas changed, scheduling task to update known work areas and zones")
-                zone_refresh_timer = threading.Timer(0.2, zone_refresh_task)
-                zone_refresh_timer.start()
+        return handle_event
 
 
-    @dataclass(frozen=True)
     class WindowState:
-        window:      Window | None          = None
-        coordinates: tuple[int, int] | None = None
-        geometry:    object | None          = None
-        extents:     list[int] | None       = None
-
-
-    def get_window_state(self, window: Window) -> WindowState:
-        if not window:
-            return Service.WindowState()
-
-        try:
-            return Service.WindowState(
-                window=window,
-                coordinates=self.ewmh.getWindowCoordinates(window),
-                geometry=window.get_geometry(),
-                extents=self.ewmh.getWindowFrameExtents(window)
-            )
-        except:
-            return Service.WindowState()
-        #TODO: - don't swallow this exception
+        """
+        Window state resolved lazily from X
+
+        Each field costs at least one synchronous X round-trip, so nothing is
+        queried until first accessed, and the result is kept until invalidated.
+        A failed query leaves the field as None.
+        """
+
+        def __init__(self, ewmh: XEWMH):
+            self.ewmh = ewmh
+
+        def invalidate(self, *fields: str):
+            for field in fields:
+                self.__dict__.pop(field, None)
+
+        @timed('window_state_query')
+        def query(self, name, getter):
+            try:
+                return getter()
+            except Exception as exception:
+                logging.debug(f"Failed to query window {name}: {exception!r}")
+                return None
+
+        @cached_property
+        def window(self) -> Window | None:
+            return self.query('window', self.ewmh.getActiveWindow)
+
+        @cached_property
+        def coordinates(self) -> tuple[int, int] | None:
+            return self.window and self.query('coordinates', lambda: self.ewmh.getWindowCoordinates(self.window))
+
+        @cached_property
+        def geometry(self) -> object | None:
+            return self.window and self.query('geometry', self.window.get_geometry)
+
+        @cached_property
+        def extents(self) -> list[int] | None:
+            return self.window and self.query('extents', lambda: self.ewmh.getWindowFrameExtents(self.window))
+
+
+    @timed('get_window_state')
+    def get_window_state(self, event) -> WindowState:
+        # The state is cached for the length of a drag (ButtonPress through to
+        # ButtonRelease), outside of a drag every event gets a fresh state that
+        # is never queried unless a handler needs it, so idle mouse movement
+        # and key presses cost no X requests
+        if self.window_state is None or self.active_window is None or (event.type, event.detail) == (X.ButtonPress, X.Button1):
+            self.window_state = Service.WindowState(self.ewmh)
+        elif event.type == X.MotionNotify and SETTINGS.snapshot.snap_basis_point == 'window':
+            # The dragged window follows the pointer, so only its position goes stale
+            self.window_state.invalidate('coordinates')
+        return self.window_state
 
     def get_window_basis_point(self, geometry, coordinates: tuple[int, int], extents: list[int]):
         el, er, _, _ = extents
@@ -198,13 +479,25 @@ class Service:
             self.last_active_window_position = basis_point
             self.active_window_has_moved = True
 
-            if SETTINGS.highlight_hover_zone:
+            if SETTINGS.snapshot.highlight_hover_zone:
                 hover_zone = self.zone_profile.find_zone(self.current_virtual_desktop, *basis_point)
-                self.zone_window.set_hover_zone(hover_zone)
-                GLib.idle_add(self.zone_window.queue_draw)
+                self.update_hover_zone(hover_zone)
+
+
+    @timed('overlay_invalidation')
+    def update_hover_zone(self, hover_zone):
+        # Only the old and new hover zones are redrawn, and only when they differ
+        if self.zone_display is None:
+            return
+        damaged_areas = self.zone_display.set_hover_zone(hover_zone)
+        if damaged_areas:
+            self.counters['overlay_invalidations'] += 1
+        for window, area in damaged_areas:
+            self.run_in_main_loop(window.redraw_area, *area)
 
 
     def on_mousebutton_up(self, event_window: Window, basis_point: tuple[int, int]):
+        self.button_released_at = time.monotonic()
         self.mouse_button_down = False
         try :
             # TODO: figure out if there's a fullscreen app running and do nothing in that case
@@ -221,7 +514,7 @@ class Service:
         self.last_active_window_position = None
 
         if SETTINGS.highlight_hover_zone:
-            self.zone_window.set_hover_zone(None)
+            self.update_hover_zone(None)
 
 
     def on_key_updown(self, event):
@@ -244,19 +537,14 @@ class Service:
         self.active_keys_down = all(self.active_keys.values())
 
 
+    @timed('process_event')
     def process_event(self, event):
         # TODO: if Escape is pressed, cancel snapping
 
-        # Getting the window state is not particularly expensive, but is also
-        # not an insigificant operation. A later optimization, if necessary,
-        # may be to change properties to be lazily instantiated and cached
-        # as this state is meant to only last for this single process_event()
-        # and not all fields may be needed
-        event_window = self.get_window_state(
-            self.active_window if self.active_window else self.ewmh.getActiveWindow()
-        )
+        settings = SETTINGS.snapshot
+        event_window = self.get_window_state(event)
 
-        if SETTINGS.snap_basis_point == 'window' and self.active_window:
+        if settings.snap_basis_point == 'window' and self.active_window and event_window.coordinates and event_window.geometry:
             basis_point = self.get_window_basis_point(event_window.geometry, event_window.coordinates, event_window.extents)
         else:
             basis_point = (event.root_x, event.root_y)
@@ -276,47 +564,245 @@ class Service:
 
 
         active_mode = self.mouse_button_down and self.active_keys_down
-        if SETTINGS.wait_for_window_movement and not self.active_window_has_moved:
+        if settings.wait_for_window_movement and not self.active_window_has_moved:
             active_mode = False
 
         if not self.zones_shown and active_mode:
-            GLib.idle_add(self.zone_window.show)
+            activated_at = time.monotonic()
+            zone_display = self.zone_display or self.load_zone_display()
+            self.run_in_main_loop(zone_display.show, activated_at)
             self.zones_shown = True
         elif self.zones_shown and not active_mode:
-            GLib.idle_add(self.zone_window.hide)
+            self.run_in_main_loop(self.zone_display.hide)
             self.zones_shown = False
 
+        # Motion is only of interest once a drag starts or the keybindings are
+        # held, otherwise just the key and button events are received
+        motion = self.mouse_button_down or self.active_keys_down
+        if motion != self.input_backend.motion:
+            self.counters['motion_subscription_switches'] += 1
+            self.input_backend.set_motion(motion)
 
-    def event_handler(self, reply):
-        data = reply.data
 
-        while len(data):
-            event, data = rq.EventField(None).parse_binary_value(
-                data, self.ewmh.display.display, None, None
-            )
+    def coalesce_events(self, events):
+        # Consecutive motion events collapse to the latest position, while
+        # button and key events are always kept, in order
+        #
+        # With a coalescing interval, the latest motion is also held back
+        # until the interval has passed since the last processed motion, or
+        # until any other event arrives (so a button release always sees the
+        # final position first), or else by motion_flush_task() once the
+        # interval is up (the pointer having stopped)
+        interval = SETTINGS.snapshot.motion_coalescing_interval / 1000
+
+        for index, event in enumerate(events):
+            if event.type != X.MotionNotify:
+                if self.pending_motion_event:
+                    yield self.pending_motion_event
+                    self.pending_motion_event = None
+                yield event
+                continue
+
+            if index + 1 < len(events) and events[index + 1].type == X.MotionNotify:
+                continue
+
+            now = time.monotonic()
+            if interval and now - self.last_motion_time < interval:
+                if self.pending_motion_event is None:
+                    self.scheduler.schedule('motion_flush', self.last_motion_time + interval - now, self.motion_flush_task)
+                self.pending_motion_event = event
+                continue
+
+            self.pending_motion_event = None
+            self.last_motion_time = now
+            yield event
+
+
+    def motion_flush_task(self, ewmh):
+        # Scheduler task, the trailing edge of the motion coalescing
+        interval = SETTINGS.snapshot.motion_coalescing_interval / 1000
+        with self.event_lock:
+            event = self.pending_motion_event
+            if event is None or self.paused:
+                return
+
+            now = time.monotonic()
+            remaining = self.last_motion_time + interval - now
+            if remaining > 0:
+                self.scheduler.schedule('motion_flush', remaining, self.motion_flush_task)
+                return
+
+            self.pending_motion_event = None
+            self.last_motion_time = now
+            self.counters['events_processed'] += 1
             self.process_event(event)
 
 
+    def event_handler(self, events):
+        self.counters['events_received'] += len(events)
+
+        if self.paused:
+            self.counters['events_dropped'] += len(events)
+            if self.zones_shown or self.mouse_button_down or self.active_keys_down or self.input_backend.motion:
+                with self.event_lock:
+                    self.release_input_state()
+            return
+
+        if self.profiler is not None:
+            # The profiler is only ever enabled on this thread, and taken away
+            # (see stop_profiling()) between batches
+            with self.profiler_lock:
+                profiler = self.profiler
+                if profiler:
+                    profiler.enable()
+                try:
+                    self.process_events(events)
+                finally:
+                    if profiler:
+                        profiler.disable()
+            return
+
+        self.process_events(events)
+
+    def process_events(self, events):
+        # Held back motion may be processed by the scheduler meanwhile, see
+        # motion_flush_task()
+        with self.event_lock:
+            for event in self.coalesce_events(events):
+                self.counters['events_processed'] += 1
+                self.process_event(event)
+
+    def release_input_state(self):
+        # Paused mid-drag (or with the keybindings held), the releases would
+        # never be seen, so everything is let go of straight away instead
+        if self.zones_shown:
+            self.run_in_main_loop(self.zone_display.hide)
+            self.zones_shown = False
+        self.update_hover_zone(None)
+
+        self.active_window = None
+        self.window_state = None
+        self.mouse_button_down = False
+        self.last_active_window_position = None
+        self.active_window_has_moved = False
+        self.active_keys = dict.fromkeys(self.active_keys, False)
+        self.active_keys_down = False
+        self.active_keys_quick_shift = dict.fromkeys(self.active_keys_quick_shift, False)
+        self.pending_motion_event = None
+
+        if self.input_backend.motion:
+            self.counters['motion_subscription_switches'] += 1
+            self.input_backend.set_motion(False)
+
+
+    def reload_settings(self, snapshot: SettingsSnapshot):
+        # From the control thread, the snapshot is swapped in whole and the
+        # rest is left to the scheduler
+        SETTINGS.snapshot = snapshot
+        if self.event_loop == 'glib':
+            # The GLib scheduler belongs to the main loop
+            from gi.repository import GLib
+            GLib.idle_add(self.scheduler.schedule, 'reload', 0, self.reload_task)
+        else:
+            self.scheduler.schedule('reload', 0, self.reload_task)
+
+    def reload_task(self, ewmh):
+        logging.info("Reloading settings")
+        self.active_keys = { keysym: self.active_keys.get(keysym, False) for keysym in SETTINGS.keybinding_keysyms }
+        self.active_keys_down = all(self.active_keys.values())
+        self.active_keys_quick_shift = { keysym: self.active_keys_quick_shift.get(keysym, False) for keysym in SETTINGS.keybinding_quick_shift_keysyms }
+
+        self.zone_profile = get_zone_profile(ewmh)
+        if self.zone_display is not None:
+            self.run_in_main_loop(self.zone_display.load_settings)
+        self.update_zone_display(prerender=True)
+
+
+    def start_profiling(self) -> bool:
+        with self.profiler_lock:
+            if self.profiler is not None:
+                return False
+            self.profiler = cProfile.Profile()
+            return True
+
+    def stop_profiling(self, output: Path | None = None) -> str | None:
+        # The report of the event processing since start_profiling(), sorted by
+        # cumulative time, the raw profile is written to output if given
+        with self.profiler_lock:
+            profiler, self.profiler = self.profiler, None
+        if profiler is None:
+            return None
+
+        if output is not None:
+            profiler.dump_stats(output)
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(30)
+        return report.getvalue()
+
+
+    def get_stats(self) -> dict:
+        return {
+            "paused": self.paused,
+            "counters": dict(self.counters),
+            "scheduler": dict(self.scheduler.counters),
+            "metrics": metrics.get_metrics(),
+            "snaps": self.snap_tracker.get_stats() if self.snap_tracker else None,
+        }
+
+    def get_zones(self) -> dict:
+        return {
+            "current_virtual_desktop": self.current_virtual_desktop,
+            **zone_cache.encode_profile(self.zone_profile),
+        }
+
+
+    def get_session_header(self) -> dict:
+        # What a replay needs besides the events, see session_log
+        display = self.ewmh.display
+        min_keycode = display.display.info.min_keycode
+        max_keycode = display.display.info.max_keycode
+        geometry = self.ewmh.root.get_geometry()
+        return {
+            "screen": [geometry.width, geometry.height],
+            "min_keycode": min_keycode,
+            "keysyms": [display.keycode_to_keysym(keycode, 0) for keycode in range(min_keycode, max_keycode + 1)],
+            "monitors": self.zone_profile.monitors,
+            "work_areas": [[astuple(work_area) for work_area in work_areas] for work_areas in self.zone_profile.work_areas],
+            "current_virtual_desktop": self.current_virtual_desktop,
+        }
+
     def listen(self):
-        # Not sure why this needs its own Display but display-referencing behavior
-        # becomes somewhat unpredictable without it
-        self.record_display = Display()
-        self.context = self.record_display.record_create_context(
-            0,
-            [record.AllClients],
-            [
-                {
-                    "core_requests": (0, 0),
-                    "core_replies": (0, 0),
-                    "ext_requests": (0, 0, 0, 0),
-                    "ext_replies": (0, 0, 0, 0),
-                    "delivered_events": (0, 0),
-                    "device_events": (X.KeyReleaseMask, X.ButtonReleaseMask),
-                    "errors": (0, 0),
-                    "client_started": False,
-                    "client_died": False,
-                }
-            ],
-        )
-        self.record_display.record_enable_context(self.context, self.event_handler)
-        self.record_display.record_free_context(self.context)
+        self.input_backend = self.input_backend_type(self.event_handler, self.ewmh.display)
+
+        if self.record_session:
+            logging.info(f"Recording session to {self.record_session}")
+            self.input_backend.session_recorder = SessionRecorder(self.record_session, self.get_session_header())
+
+        socket_path = get_socket_path()
+        if socket_path is not None:
+            ControlServer(self, socket_path).start()
+        else:
+            logging.warning("No runtime or data directory for the control socket, control disabled")
+
+        if self.event_loop == 'glib':
+            # Input is processed on the main (GTK) thread in turn
+            from gi.repository import GLib
+            self.input_backend.watch()
+            if SETTINGS.overlay_loading == 'background':
+                def load_zone_display():
+                    self.load_zone_display()
+                    return False
+                GLib.idle_add(load_zone_display, priority=GLib.PRIORITY_LOW)
+            if self.zone_display is not None:
+                from .zone_display import run_zone_display
+                run_zone_display()
+            else:
+                # Overlay windows created later on are served by the same
+                # (default) main context
+                GLib.MainLoop().run()
+        else:
+            if SETTINGS.overlay_loading == 'background':
+                thread = threading.Thread(target=self.load_zone_display)
+                thread.daemon=True
+                thread.start()
+            self.input_backend.run()
@@ -0,0 +1,68 @@
+import json
+import struct
+import time
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+"""
+
+Session logs hold the raw RECORD reply data intercepted during a session, so
+drags can be replayed offline (see benchmarks/replay_session.py)
+
+    magic           8 bytes, b'PYXZSES1'
+    header length   CARD32
+    header          json, whatever is needed to rebuild the session state
+                    (screen size, keymap, monitors and work areas)
+
+followed by one record per RECORD reply:
+
+    timestamp       CARD64, time.monotonic_ns() at reception
+    data length     CARD32
+    data            the reply data, a run of 32 byte wire format events
+
+All integers are in native byte order, as is the reply data.
+
+"""
+
+MAGIC = b'PYXZSES1'
+HEADER_LENGTH = struct.Struct('=I')
+RECORD = struct.Struct('=QI')
+
+
+class SessionLogError(ValueError):
+    pass
+
+
+class SessionRecorder:
+    def __init__(self, file: Path, header: dict):
+        # Unbuffered, so a killed session still leaves every reply up to then
+        self.file = open(file, 'wb', buffering=0)
+        header_data = json.dumps(header, separators=(',', ':')).encode()
+        self.file.write(MAGIC + HEADER_LENGTH.pack(len(header_data)) + header_data)
+
+    def write(self, data: bytes):
+        self.file.write(RECORD.pack(time.monotonic_ns(), len(data)) + data)
+
+    def close(self):
+        self.file.close()
+
+
+def read_session_header(file: BinaryIO) -> dict:
+    if file.read(len(MAGIC)) != MAGIC:
+        raise SessionLogError("not a pyxzones session log")
+    length, = HEADER_LENGTH.unpack(file.read(HEADER_LENGTH.size))
+    return json.loads(file.read(length))
+
+
+def read_session_records(file: BinaryIO) -> Iterator[tuple[int, bytes]]:
+    # Yields (timestamp, data), a record cut short (the recording process
+    # being killed mid-write) ends the log
+    while True:
+        record = file.read(RECORD.size)
+        if len(record) < RECORD.size:
+            return
+        timestamp, length = RECORD.unpack(record)
+        data = file.read(length)
+        if len(data) < length:
+            return
+        yield timestamp, data
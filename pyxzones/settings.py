@@ -1,130 +1,252 @@
 import json
+import logging
+from dataclasses import dataclass, field, fields
+from operator import attrgetter
 from pathlib import Path
+from types import MappingProxyType
+from Xlib import X, XK
 
-class Settings:
 
-    def __init__(self):
-        self.user_configuration = None
+class SettingsError(ValueError):
+    pass
 
-    # This lookup mechanism is not particularly slow, but frequently accessed
-    # fields could be cached by the accessor if concerned
-    def __getattribute__(self, name):
-        if name != 'user_configuration' and self.user_configuration and name in self.user_configuration:
-            return self.user_configuration[name]
-        return super().__getattribute__(name)
 
-    def load_from_file(self, file: Path):
-        self.user_configuration = json.load(file)
-
-    @property
-    def zones(self):
-        return {
-            "displays": [  # list of displays
-                {  # display 1, horizontal (from left to right in virtual display)
-                    "orientation": "landscape",
-                    "columns": [ 10, 80, 10 ]
-                },
-                {  # display 2, vertical
-                    "orientation": "portrait",
-                    "rows": [ 35, 40, 25 ]
-                },
-            ]
-        }
-
-    @property
-    def keybindings(self):
-        # Shift_L has some annoying window grid snapping functionality in Mutter/Cinnamon
-        # (so does Alt for window moving, but that can be disabled if desired)
-        return ['Alt_L'] #["Shift_L"]
-    
-    @property
-    def keybinding_quick_shift(self):
-        # Shift_L has some annoying window grid snapping functionality in Mutter/Cinnamon
-        # (so does Alt for window moving, but that can be disabled if desired)
-        return ['Alt_L', 'Shift_L']
-
-    @property
-    def maximize_perpendicular_axis_on_snap(self):
-        # This is most useful for GTK3.0 windows with their self-determined window margins,
-        # but does not correct snapping to full zone on the display axis
-        #
-        # This can also be useful for stubborn windows, like terminals, which may round down
-        # a given window size to align with the closest column/row, yet won't struggle with
-        # being maximized
-        return False
-
-    @property
-    def wait_for_window_movement(self):
-        return True
-
-    @property
-    def snap_basis_point(self):
-        # Valid values: 'cursor' or 'window'
-        #
-        # 'cursor': will use the mouse cursor as the determining point for zone selection
-        # 'window': will use the center of the top of the window as the determining point
-        return 'cursor'
+def freeze(value):
+    # Deeply immutable copy of parsed json (dicts become read-only mappings,
+    # lists become tuples)
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list | tuple):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def default_zones():
+    return freeze({
+        "displays": [  # list of displays
+            {  # display 1, horizontal (from left to right in virtual display)
+                "orientation": "landscape",
+                "columns": [ 10, 80, 10 ]
+            },
+            {  # display 2, vertical
+                "orientation": "portrait",
+                "rows": [ 35, 40, 25 ]
+            },
+        ]
+    })
+
+
+@dataclass(frozen=True, slots=True)
+class SettingsSnapshot:
+    """
+    Defaults merged with the user configuration, validated and compiled once
+    at load, after which every field is a plain (slotted) attribute read
+    """
+
+    zones: MappingProxyType = field(default_factory=default_zones)
+
+    # Shift_L has some annoying window grid snapping functionality in Mutter/Cinnamon
+    # (so does Alt for window moving, but that can be disabled if desired)
+    keybindings: tuple[str, ...] = ('Alt_L',) #("Shift_L",)
+
+    keybinding_quick_shift: tuple[str, ...] = ('Alt_L', 'Shift_L')
+
+    # This is most useful for GTK3.0 windows with their self-determined window margins,
+    # but does not correct snapping to full zone on the display axis
+    #
+    # This can also be useful for stubborn windows, like terminals, which may round down
+    # a given window size to align with the closest column/row, yet won't struggle with
+    # being maximized
+    maximize_perpendicular_axis_on_snap: bool = False
+
+    wait_for_window_movement: bool = True
+
+    # Valid values: 'cursor' or 'window'
+    #
+    # 'cursor': will use the mouse cursor as the determining point for zone selection
+    # 'window': will use the center of the top of the window as the determining point
+    snap_basis_point: str = 'cursor'
 
     # Inset (margin) in pixels
-    @property
-    def zone_border_inset(self) -> int:
-        return 5
+    zone_border_inset: int = 5
 
     # float (r, g, b, a)
-    @property
-    def zone_border_color(self) -> tuple[float, float, float, float]:
-        return (0.4, 0.4, 0.8, 0.8)
+    zone_border_color: tuple[float, float, float, float] = (0.4, 0.4, 0.8, 0.8)
 
     # Border thickness in pixels
-    @property
-    def zone_border_thickness(self) -> int:
-        return 5
+    zone_border_thickness: int = 5
 
     # float (r, g, b, a)
-    @property
-    def zone_background_color(self) -> tuple[float, float, float, float]:
-        return (0.6, 0.6, 1.0, 0.2)
+    zone_background_color: tuple[float, float, float, float] = (0.6, 0.6, 1.0, 0.2)
 
     # Inset (margin) in pixels
-    @property
-    def zone_background_inset(self) -> int:
-        return 0
+    zone_background_inset: int = 0
 
-    @property
-    def highlight_hover_zone(self) -> bool:
-        return True
+    highlight_hover_zone: bool = True
+
+    # Keep the zone overlay mapped (and input transparent) at all times, only
+    # toggling its opacity (or shape, without a compositor) on activation,
+    # which avoids the mapping delay and any WM placement on every show
+    persistent_overlay: bool = False
+
+    # Valid values: 'auto', 'always' or 'never'
+    #
+    # Shaped overlays are opaque windows cut down (XShape) to the zone borders
+    # and the hovered zone, which needs no compositor at all and next to no
+    # drawing, at the cost of translucency. 'auto' uses them only when no
+    # compositor is running
+    shaped_overlay: str = 'auto'
+
+    # Valid values: 'startup', 'background' or 'first_use'
+    #
+    # When GTK and the overlay windows get loaded, which is most of the
+    # startup time and memory. Both 'background' and 'first_use' start
+    # listening for input straight away, 'background' loads the overlay right
+    # after while 'first_use' waits for the zones to be shown (which then
+    # takes that much longer, once)
+    overlay_loading: str = 'startup'
 
     # Inset (margin) in pixels
-    @property
-    def hover_zone_border_inset(self) -> int:
-        return 5
+    hover_zone_border_inset: int = 5
 
     # float (r, g, b, a)
-    @property
-    def hover_zone_border_color(self) -> tuple[float, float, float, float]:
-        return (0.8, 0.0, 0.6, 0.9)
+    hover_zone_border_color: tuple[float, float, float, float] = (0.8, 0.0, 0.6, 0.9)
 
     # Border thickness in pixels
-    @property
-    def hover_zone_border_thickness(self) -> int:
-        return 5
+    hover_zone_border_thickness: int = 5
 
     # float (r, g, b, a)
-    @property
-    def hover_zone_background_color(self) -> tuple[float, float, float, float]:
-        return (0.8, 0.0, 0.6, 0.6)
+    hover_zone_background_color: tuple[float, float, float, float] = (0.8, 0.0, 0.6, 0.6)
 
     # Inset (margin) in pixels
-    @property
-    def hover_zone_background_inset(self) -> int:
-        return 0
+    hover_zone_background_inset: int = 0
 
     # Percentage of usable work area (generally, screen) to use for identifying
     # merge boundaries across zone borders (for example, 7% is 3.5% on each side
     # of a zone border)
-    @property
-    def merge_zone_size_preference(self) -> float:
-        return 7
+    merge_zone_size_preference: float = 7
+
+    # Milliseconds to hold back mouse motion after one has been processed,
+    # only the latest position within the interval is used (0 only collapses
+    # motion events arriving together in the same batch)
+    motion_coalescing_interval: int = 0
+
+    # Milliseconds to wait for a burst of virtual desktop or work area changes
+    # (monitor hotplug, panel reload, ...) to settle before refreshing
+    desktop_change_delay: int = 200
+    work_area_change_delay: int = 200
+
+    # Follow snapped windows until the WM applies the zone geometry, keeping
+    # per application (WM_CLASS) latency and failure statistics, which are
+    # dumped on SIGUSR1
+    snap_latency_tracking: bool = False
+
+    # Milliseconds to wait for a snapped window to converge on its zone
+    snap_latency_timeout: int = 1000
+
+    # Precomputed from the fields above, not configurable
+    keybinding_keysyms: frozenset[int] = field(init=False)
+    keybinding_quick_shift_keysyms: frozenset[int] = field(init=False)
+
+    def __post_init__(self):
+        if self.snap_basis_point not in ('cursor', 'window'):
+            raise SettingsError(f"snap_basis_point must be 'cursor' or 'window', not {self.snap_basis_point!r}")
+
+        if self.shaped_overlay not in ('auto', 'always', 'never'):
+            raise SettingsError(f"shaped_overlay must be 'auto', 'always' or 'never', not {self.shaped_overlay!r}")
+
+        if self.overlay_loading not in ('startup', 'background', 'first_use'):
+            raise SettingsError(f"overlay_loading must be 'startup', 'background' or 'first_use', not {self.overlay_loading!r}")
+
+        for display in self.zones.get('displays', ()):
+            orientation = display.get('orientation')
+            if orientation not in ('landscape', 'portrait'):
+                raise SettingsError(f"zone display orientation must be 'landscape' or 'portrait', not {orientation!r}")
+            slices = display.get('columns' if orientation == 'landscape' else 'rows')
+            if not slices or not all(type(size) in (int, float) and size > 0 for size in slices):
+                raise SettingsError(f"zone display {'columns' if orientation == 'landscape' else 'rows'} must be a list of positive numbers")
+
+        object.__setattr__(self, 'keybinding_keysyms', get_keysyms('keybindings', self.keybindings))
+        object.__setattr__(self, 'keybinding_quick_shift_keysyms', get_keysyms('keybinding_quick_shift', self.keybinding_quick_shift))
+
+    @classmethod
+    def compile(cls, user_configuration: dict) -> 'SettingsSnapshot':
+        if type(user_configuration) is not dict:
+            raise SettingsError("configuration must be a json object")
+
+        configurable = {f.name: f for f in fields(cls) if f.init}
+        values = {}
+
+        for name, value in user_configuration.items():
+            if name not in configurable:
+                logging.warning(f"Ignoring unknown setting {name!r}")
+                continue
+            values[name] = coerce(name, value, configurable[name].type)
+
+        return cls(**values)
+
+
+def get_keysyms(name: str, keys: tuple[str, ...]) -> frozenset[int]:
+    keysyms = frozenset(XK.string_to_keysym(key) for key in keys)
+    if X.NoSymbol in keysyms:
+        raise SettingsError(f"{name} contains an unknown key name: {keys}")
+    return keysyms
+
+
+def coerce(name: str, value, expected):
+    if expected == bool:
+        if type(value) is not bool:
+            raise SettingsError(f"{name} must be true or false, not {value!r}")
+        return value
+
+    if expected in (int, float):
+        if type(value) not in (int, float):
+            raise SettingsError(f"{name} must be a number, not {value!r}")
+        return value
+
+    if expected == str:
+        if type(value) is not str:
+            raise SettingsError(f"{name} must be a string, not {value!r}")
+        return value
+
+    if expected == tuple[float, float, float, float]:
+        if type(value) not in (list, tuple) or len(value) != 4 or not all(type(c) in (int, float) for c in value):
+            raise SettingsError(f"{name} must be a list of four numbers (r, g, b, a), not {value!r}")
+        return tuple(float(c) for c in value)
+
+    if expected == tuple[str, ...]:
+        if type(value) not in (list, tuple) or not all(type(key) is str for key in value):
+            raise SettingsError(f"{name} must be a list of key names, not {value!r}")
+        return tuple(value)
+
+    if type(value) is not dict:
+        raise SettingsError(f"{name} must be an object, not {value!r}")
+    return freeze(value)
+
+
+class Settings:
+    """
+    Holds the current SettingsSnapshot, swapped as a whole on (re)load
+
+    Every snapshot field is readable from here as well, but hot paths should
+    take SETTINGS.snapshot once and read from that instead (which also gives
+    them a consistent view should a reload happen mid-way)
+    """
+
+    __slots__ = ('snapshot',)
+
+    def __init__(self):
+        self.snapshot = SettingsSnapshot()
+
+    def load(self, user_configuration: dict):
+        self.snapshot = SettingsSnapshot.compile(user_configuration)
+
+    def load_from_file(self, file: Path):
+        self.load(json.load(file))
+
+
+for name in SettingsSnapshot.__dataclass_fields__:
+    setattr(Settings, name, property(attrgetter(f"snapshot.{name}")))
 
 
 """
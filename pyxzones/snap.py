@@ -1,10 +1,12 @@
 import logging
 from Xlib.error import BadDrawable
 
+from .metrics import timed
 from .settings import SETTINGS
 from .types import MergeZone
 
 
+@timed('snap_window')
 def snap_window(self, window, x, y):
     logging.debug(f"  snap_window({x=}, {y=})")
     try:
@@ -29,14 +31,26 @@ def snap_window(self, window, x, y):
             # would be ideal but haven't found a viable option to do so yet
             # and it may be exclusive to one X11 client at a time (intended for WM)
             el, er, et, eb = extents
+            width = zone.width - el - er
+            height = zone.height - et - eb
+
+            if self.snap_tracker:
+                # A maximized perpendicular axis won't end up at the zone size
+                maximize = SETTINGS.maximize_perpendicular_axis_on_snap
+                self.snap_tracker.track(
+                    window, width, height,
+                    match_width=not maximize or zone.orientation == 'landscape',
+                    match_height=not maximize or zone.orientation != 'landscape',
+                    released_at=self.button_released_at
+                )
 
             # ewmh method is much more reliable than window.configure
             self.ewmh.setMoveResizeWindow(
                 window,
                 x=zone.x,
                 y=zone.y,
-                w=zone.width - el - er,
-                h=zone.height - et - eb
+                w=width,
+                h=height
             )
 
             # these window hints provide better movement of windows rather than arbitrary dimensions
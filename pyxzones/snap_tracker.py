@@ -0,0 +1,165 @@
+import logging
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable
+from Xlib import X
+from Xlib.error import CatchError
+
+from .metrics import Histogram
+
+
+@dataclass
+class PendingSnap:
+    window_id: int
+    width: int
+    height: int
+    # Which of the dimensions have to match, only one of them does when the
+    # perpendicular axis gets maximized on snap
+    match_width: bool
+    match_height: bool
+    released_at: float
+    deadline: float
+    configure_notifies: int = 0
+    last_size: tuple[int, int] | None = None
+
+    def matches(self, width: int, height: int) -> bool:
+        return (not self.match_width or width == self.width) and (not self.match_height or height == self.height)
+
+
+@dataclass
+class SnapStats:
+    latency: Histogram = field(default_factory=Histogram)
+    outcomes: Counter = field(default_factory=Counter)
+
+
+class SnapTracker:
+    """
+    Follows snapped windows until the WM has applied the requested geometry
+
+    StructureNotify is selected on the window before it is asked to move, and
+    the time from the button release to the first ConfigureNotify with the
+    requested size is recorded per WM_CLASS. Windows that don't get there
+    within the timeout are recorded by outcome instead:
+
+        in_place        never configured, but already had the requested size
+        not_converged   configured, but never to the requested size (size
+                        hints rounding, minimum sizes, ...)
+        timeout         never configured at all
+        destroyed       gone before converging
+    """
+
+    def __init__(self, display, scheduler, timeout: float):
+        # The connection delivering the ConfigureNotify events, see handle_event()
+        self.display = display
+        self.scheduler = scheduler
+        self.timeout = timeout
+
+        self.lock = threading.Lock()
+        self.pending: dict[int, PendingSnap] = {}
+        self.stats: dict[str, SnapStats] = {}
+
+        # Called after track() syncs, as the sync can read events off the
+        # connection into Xlib's queue (see Service.setup_property_change_monitor())
+        self.on_sync: Callable[[], None] | None = None
+
+    def track(self, window, width: int, height: int, match_width: bool, match_height: bool, released_at: float):
+        # Synchronous, so the selection is in place before the move request
+        # goes out from the other connection
+        self.display.create_resource_object('window', window.id).change_attributes(event_mask=X.StructureNotifyMask)
+        self.display.sync()
+        if self.on_sync:
+            self.on_sync()
+
+        with self.lock:
+            self.pending[window.id] = PendingSnap(
+                window.id, width, height, match_width, match_height,
+                released_at, time.monotonic() + self.timeout
+            )
+        self.scheduler.schedule('snap_timeout', self.timeout, self.expire)
+
+    def handle_event(self, event):
+        # ConfigureNotify/DestroyNotify from the tracked windows themselves
+        now = time.monotonic()
+        with self.lock:
+            snap = self.pending.get(event.window.id)
+            if snap is None:
+                return
+
+            if event.type == X.DestroyNotify:
+                del self.pending[snap.window_id]
+                outcome = 'destroyed'
+            elif event.type == X.ConfigureNotify:
+                snap.configure_notifies += 1
+                snap.last_size = (event.width, event.height)
+                if not snap.matches(event.width, event.height):
+                    return
+                del self.pending[snap.window_id]
+                outcome = 'converged'
+            else:
+                return
+
+        self.finish(self.display, snap, outcome, now - snap.released_at)
+
+    def expire(self, ewmh):
+        # Scheduler task, with the scheduler's own connection
+        now = time.monotonic()
+        with self.lock:
+            expired = [snap for snap in self.pending.values() if snap.deadline <= now]
+            for snap in expired:
+                del self.pending[snap.window_id]
+            remaining = min((snap.deadline for snap in self.pending.values()), default=None)
+
+        for snap in expired:
+            if snap.configure_notifies:
+                outcome = 'not_converged'
+            else:
+                try:
+                    geometry = ewmh.display.create_resource_object('window', snap.window_id).get_geometry()
+                    outcome = 'in_place' if snap.matches(geometry.width, geometry.height) else 'timeout'
+                except Exception:
+                    outcome = 'destroyed'
+            self.finish(ewmh.display, snap, outcome, None)
+
+        if remaining is not None:
+            self.scheduler.schedule('snap_timeout', max(0, remaining - now), self.expire)
+
+    def finish(self, display, snap: PendingSnap, outcome: str, latency: float | None):
+        window = display.create_resource_object('window', snap.window_id)
+        wm_class = None
+        if outcome != 'destroyed':
+            try:
+                wm_class = window.get_wm_class()
+            except Exception:
+                pass
+            window.change_attributes(event_mask=0, onerror=CatchError())
+            display.flush()
+        wm_class = wm_class[1] if wm_class else '(unknown)'
+
+        logging.debug(f"Snap of {snap.window_id:#x} ({wm_class}) {outcome}" + (f" after {latency * 1000:.1f} ms" if latency is not None else f", last size {snap.last_size}"))
+
+        with self.lock:
+            stats = self.stats.setdefault(wm_class, SnapStats())
+            stats.outcomes[outcome] += 1
+            if latency is not None:
+                stats.latency.add(int(latency * 1e9))
+
+    def get_stats(self) -> dict[str, dict]:
+        with self.lock:
+            return {
+                wm_class: {"outcomes": dict(stats.outcomes), "latency": stats.latency.to_dict()}
+                for wm_class, stats in self.stats.items()
+            }
+
+    def format_stats(self) -> str:
+        lines = [f"{'wm_class':<32} {'snaps':>6} {'p50':>8} {'p90':>8} {'max':>10}  outcomes  (ms)"]
+        for wm_class, stats in sorted(self.get_stats().items()):
+            latency = stats["latency"]
+            timings = (
+                f"{latency['p50_us'] / 1000:>8g} {latency['p90_us'] / 1000:>8g} {latency['max_us'] / 1000:>10.1f}"
+                if latency["count"] else f"{'-':>8} {'-':>8} {'-':>10}"
+            )
+            outcomes = ", ".join(f"{outcome} {count}" for outcome, count in sorted(stats["outcomes"].items()))
+            lines.append(f"{wm_class:<32} {sum(stats['outcomes'].values()):>6} {timings}  {outcomes}")
+        return "\n".join(lines)
@@ -14,12 +14,23 @@ This extension is just for fun, for now.
 
 class XEWMH(EWMH):
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.coordinate_resolver = xq.WindowCoordinateResolver(self.display, self.root)
+
+    def internAtoms(self):
+        # Interns every atom work areas are looked up by, in a single round-trip
+        return xq.intern_atoms(self.display, xq.get_work_area_atom_names(self.getNumberOfDesktops()))
+
     def getMonitors(self):
         return xq.get_monitors(self.display, self.root)
 
     def getWorkAreasForVirtualDesktop(self, desktop_index: int):
         return xq.get_work_areas(self.display, desktop_index)
 
+    def getWorkAreasForVirtualDesktops(self, desktop_indexes: list[int]):
+        return xq.get_work_areas_for_desktops(self.display, desktop_indexes)
+
     def getWorkAreasForAllVirtualDesktops(self):
         return xq.get_work_areas_for_all_desktops(self.display, self.getNumberOfDesktops())
 
@@ -27,4 +38,7 @@ class XEWMH(EWMH):
         return xq.get_window_frame_extents(self.display, window)
 
     def getWindowCoordinates(self, window):
-        return xq.get_window_coordinates(window)
+        return self.coordinate_resolver.resolve(window)
+
+    def getWindowsCoordinates(self, windows):
+        return self.coordinate_resolver.resolve_many(windows)
@@ -1,20 +1,126 @@
 import logging
-from Xlib import Xatom, threaded # type: ignore
+import time
+from Xlib import X, Xatom, threaded # type: ignore
+from Xlib.error import XError
 from Xlib.ext import randr
+from Xlib.protocol import request
 
 from .types import WorkArea
 
 
+def reply_all(requests: list) -> list:
+    # Requests created with defer=True are queued without waiting on a reply,
+    # the first reply() flushes them all, so the whole batch shares a single
+    # round-trip (a failed request is returned as None)
+    replies = []
+    for pending in requests:
+        try:
+            pending.reply()
+            replies.append(pending)
+        except XError:
+            replies.append(None)
+    return replies
+
+
+# RANDR version of the X server, queried once per process
+RANDR_VERSION: tuple[int, int] | None = None
+
+
+def get_randr_version(display) -> tuple[int, int]:
+    global RANDR_VERSION
+    if RANDR_VERSION is None:
+        version = display.xrandr_query_version()
+        RANDR_VERSION = (version.major_version, version.minor_version)
+    return RANDR_VERSION
+
+
+class QueryTimer:
+    """
+    Tallies round-trips and time per stage of a query, reported at DEBUG level
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.round_trips = 0
+        self.start = self.last = time.perf_counter()
+        self.stages = []
+
+    def stage(self, stage: str, round_trips: int = 1):
+        now = time.perf_counter()
+        self.stages.append(f"{stage} {(now - self.last) * 1000:.2f} ms")
+        self.round_trips += round_trips
+        self.last = now
+
+    def report(self):
+        total = (time.perf_counter() - self.start) * 1000
+        logging.debug(f"{self.name}: {self.round_trips} round-trips in {total:.2f} ms ({', '.join(self.stages)})")
+
+
 def get_monitors(display, root_window):
+    timer = QueryTimer("get_monitors")
+    if RANDR_VERSION is None:
+        get_randr_version(display)
+        timer.stage("RRQueryVersion")
+
+    monitors = get_monitors_randr_1_5(display, root_window, timer) if RANDR_VERSION >= (1, 5) else []
+    if not monitors:
+        monitors = get_monitors_randr_crtcs(display, root_window, timer)
+    timer.report()
+
+    # sort monitors from left to right, top to bottom (as configuration is expected to be done)
+    monitors.sort(key = lambda m: (m['virtual_x'], m['virtual_y']))
+    return monitors
+
+
+def get_monitors_randr_1_5(display, root_window, timer: QueryTimer):
+    # A single request, though without the crtc modes the physical resolution
+    # (and so the scale) of each monitor isn't known, the virtual size is
+    # what zoning works with regardless
+    reply = randr.get_monitors(root_window, is_active=True)
+    timer.stage("RRGetMonitors")
+
+    monitors = []
+    for monitor in reply.monitors:
+        monitors.append({
+            "mode": None,
+            "rotation": None,
+            "virtual_x": monitor.x,
+            "virtual_y": monitor.y,
+            "virtual_width": monitor.width_in_pixels,
+            "virtual_height": monitor.height_in_pixels,
+            "width": monitor.width_in_pixels,
+            "height": monitor.height_in_pixels,
+            "scale": 1.0,
+        })
+    return monitors
+
+
+def get_monitors_randr_crtcs(display, root_window, timer: QueryTimer):
+    # Every output (and then crtc) query is sent before any reply is read,
+    # so this is three round-trips regardless of the number of outputs
     screen_resources = randr.get_screen_resources(root_window)
+    opcode = display.get_extension_major(randr.extname)
+    timer.stage("RRGetScreenResources")
+
+    output_infos = reply_all([
+        randr.GetOutputInfo(display=display.display, defer=True, opcode=opcode,
+                            output=output, config_timestamp=screen_resources.config_timestamp)
+        for output in screen_resources.outputs
+    ])
+    timer.stage(f"{len(output_infos)} x RRGetOutputInfo", round_trips=int(bool(output_infos)))
+    crtcs = [output_info.crtc for output_info in output_infos if output_info is not None and output_info.crtc != 0]
+
+    crtc_infos = reply_all([
+        randr.GetCrtcInfo(display=display.display, defer=True, opcode=opcode,
+                          crtc=crtc, config_timestamp=screen_resources.config_timestamp)
+        for crtc in crtcs
+    ])
+    timer.stage(f"{len(crtc_infos)} x RRGetCrtcInfo", round_trips=int(bool(crtc_infos)))
 
     monitors = []
-    for output in screen_resources.outputs:
-        output_info = randr.get_output_info(display, output, screen_resources.config_timestamp)
-        if output_info.crtc == 0:
+    for crtc_info in crtc_infos:
+        if crtc_info is None:
             continue
-
-        crtc_info = randr.get_crtc_info(display, output_info.crtc, screen_resources.config_timestamp)
         monitors.append({
             "mode": crtc_info.mode,
             "rotation": crtc_info.rotation,
@@ -24,9 +130,6 @@ def get_monitors(display, root_window):
             "virtual_height": crtc_info.height,
         })
 
-    # sort monitors from left to right, top to bottom (as configuration is expected to be done)
-    monitors.sort(key = lambda m: (m['virtual_x'], m['virtual_y']))
-
     screen_mode_map = {}
     for mode in screen_resources.modes:
         screen_mode_map[mode.id] = (mode.width, mode.height)
@@ -45,85 +148,294 @@ def get_monitors(display, root_window):
     return monitors
 
 
+# Atoms are server-wide, so a single cache serves every connection of the
+# process (Xlib's own cache is per connection, and intern_atom() bypasses it)
+ATOMS: dict[str, int] = {}
+
+
+def intern_atoms(display, names: list[str]) -> list[int]:
+    missing = [name for name in dict.fromkeys(names) if name not in ATOMS]
+    if missing:
+        replies = reply_all([
+            request.InternAtom(display=display.display, defer=True, name=name, only_if_exists=False)
+            for name in missing
+        ])
+        for name, reply in zip(missing, replies):
+            if reply is not None:
+                ATOMS[name] = reply.atom
+    return [ATOMS.get(name, X.NONE) for name in names]
+
+
+def get_atom(display, name: str) -> int:
+    if name in ATOMS:
+        return ATOMS[name]
+    return intern_atoms(display, [name])[0]
+
+
+def get_work_area_atom_names(number_of_virtual_desktops: int) -> list[str]:
+    names = ['_NET_WORKAREA', '_NET_FRAME_EXTENTS']
+    for desktop in range(number_of_virtual_desktops):
+        names += [f"_GTK_WORKAREAS_D{desktop}", f"_NET_WORKAREAS_D{desktop}"]
+    return names
+
+
+# Work area sources, from best data to worst
+#
+#   _GTK_WORKAREAS_D<desktop>
+#   _NET_WORKAREAS_D<desktop>
+#   _NET_WORKAREA
+#   RootWindow.get_geometry()
+#
+WORK_AREA_TIERS = ('_GTK_WORKAREAS_D', '_NET_WORKAREAS_D', '_NET_WORKAREA', 'geometry')
+
+# The first tier that provided work areas, later refreshes skip those before it
+WORK_AREA_TIER = 0
+
+
+def get_properties(display, window, atoms: list[int], property_type) -> list:
+    # Values of many properties in a single round-trip (None where unset)
+    replies = reply_all([
+        request.GetProperty(display=display.display, defer=True, delete=False, window=window,
+                            property=atom, type=property_type, long_offset=0, long_length=1024)
+        for atom in atoms
+    ])
+    return [reply.value if reply is not None and reply.property_type != X.NONE else None for reply in replies]
+
+
+def split_work_areas(value) -> list[WorkArea]:
+    return [WorkArea(*value[l:l+4]) for l in range(0, len(value) - 3, 4)]
+
+
 # Find available space (no panels)
-def get_work_areas(display, desktop):
-    # Fallback from best data to worst
-    #
-    #   _GTK_WORKAREAS_D<desktop>
-    #   _NET_WORKAREAS_D<desktop>
-    #   _NET_WORKAREA
-    #   RootWindow.get_geometry()
-    #
-    gtk_work_area_d = display.screen().root.get_full_property(
-        display.intern_atom(f"_GTK_WORKAREAS_D{desktop}"), Xatom.CARDINAL
-    )
-    if gtk_work_area_d != None:
-        logging.debug(f"gtk_work_area_d{desktop}: {gtk_work_area_d.value}")
-        work_areas = [gtk_work_area_d.value[l:l+4] for l in range(0, len(gtk_work_area_d.value), 4)]
-        return [WorkArea(*work_areas[i]) for i in range(0, len(work_areas))]
+def get_work_areas_for_desktops(display, desktops: list[int]) -> list[list[WorkArea]]:
+    global WORK_AREA_TIER
+    timer = QueryTimer(f"get_work_areas({len(desktops)} desktops)")
+    root = display.screen().root
 
+    if any(name not in ATOMS for name in get_work_area_atom_names(max(desktops, default=-1) + 1)):
+        intern_atoms(display, get_work_area_atom_names(max(desktops, default=-1) + 1))
+        timer.stage("InternAtom")
 
-    # don't think any WM implements the _NET_WORKAREAS_D# variant at the moment
-    net_work_area_d = display.screen().root.get_full_property(
-        display.intern_atom(f"_NET_WORKAREAS_D{desktop}"), Xatom.CARDINAL
-    )
-    if net_work_area_d != None:
-        logging.debug(f"{net_work_area_d=}")
-        work_areas = [net_work_area_d.value[l:l+4] for l in range(0, len(net_work_area_d.value), 4)]
-        return [WorkArea(*work_areas[i]) for i in range(0, len(work_areas))]
+    work_areas: dict[int, list[WorkArea]] = {}
+    first_tier = None
 
+    for tier in range(WORK_AREA_TIER, len(WORK_AREA_TIERS)):
+        pending = [desktop for desktop in desktops if desktop not in work_areas]
+        if not pending:
+            break
 
-    logging.warning("_GTK_WORKAREAS is not supported, fallback to _NET_WORKAREA. "
-            "Work areas may be incorrect on multi-monitor systems.\n")
+        if tier in (0, 1):
+            atoms = [ATOMS[f"{WORK_AREA_TIERS[tier]}{desktop}"] for desktop in pending]
+            for desktop, value in zip(pending, get_properties(display, root, atoms, Xatom.CARDINAL)):
+                if value:
+                    logging.debug(f"{WORK_AREA_TIERS[tier].lower()}{desktop}: {value}")
+                    work_areas[desktop] = split_work_areas(value)
 
+        elif tier == 2:
+            # don't think any WM implements the _NET_WORKAREAS_D# variant at the moment
+            logging.warning("_GTK_WORKAREAS is not supported, fallback to _NET_WORKAREA. "
+                    "Work areas may be incorrect on multi-monitor systems.\n")
 
-    work_area_property = display.screen().root.get_full_property(
-        display.intern_atom('_NET_WORKAREA'), Xatom.CARDINAL
-    )
-    # work_area_property.value is a list of desktops of repeating x,y,w,h specs
-    # this includes virtual desktops, tbd on what this means for multi-monitor
-    
-    # TODO: this returns a large virtual-desktop without slicing monitors or unusable space
-    # the caller needs to know that a result of length 1 on multi-monitor setup is a large virtual screen
-    if work_area_property != None:
-        logging.debug(f"{work_area_property=}")
-        work_area = WorkArea(*work_area_property.value[desktop * 4:4])
-        return [work_area]
+            # value is a list of desktops of repeating x,y,w,h specs
+            # this includes virtual desktops, tbd on what this means for multi-monitor
 
-    logging.warning("_NET_WORKAREA is not supported, Work areas may be incorrect.\n")
+            # TODO: this returns a large virtual-desktop without slicing monitors or unusable space
+            # the caller needs to know that a result of length 1 on multi-monitor setup is a large virtual screen
+            value = get_properties(display, root, [ATOMS['_NET_WORKAREA']], Xatom.CARDINAL)[0]
+            if value:
+                logging.debug(f"_net_workarea: {value}")
+                desktop_work_areas = split_work_areas(value)
+                for desktop in pending:
+                    if desktop < len(desktop_work_areas):
+                        work_areas[desktop] = [desktop_work_areas[desktop]]
 
+        else:
+            logging.warning("_NET_WORKAREA is not supported, Work areas may be incorrect.\n")
 
-    # fallback to geometry
-    # there's probably a better way to map geometry data into a namedtuple
-    # but it didn't seem worth continuing to look for it
-    geometry = display.screen().root.get_geometry()
-    return [WorkArea(*[geometry.x, geometry.y, geometry.width, geometry.height])]
+            # fallback to geometry
+            geometry = root.get_geometry()
+            for desktop in pending:
+                work_areas[desktop] = [WorkArea(geometry.x, geometry.y, geometry.width, geometry.height)]
+
+        timer.stage(WORK_AREA_TIERS[tier])
+        if first_tier is None and work_areas:
+            first_tier = tier
+
+    if first_tier is not None and first_tier != WORK_AREA_TIER:
+        logging.debug(f"Work areas now read from {WORK_AREA_TIERS[first_tier]}, skipping tiers before it from now on")
+        WORK_AREA_TIER = first_tier
+
+    timer.report()
+    return [work_areas[desktop] for desktop in desktops]
+
+
+def get_work_areas(display, desktop):
+    return get_work_areas_for_desktops(display, [desktop])[0]
 
 
 def get_work_areas_for_all_desktops(display, number_of_virtual_desktops):
-    work_areas = []
-    for desktop in range(0, number_of_virtual_desktops):
-        work_areas.append(get_work_areas(display, desktop))
-    return work_areas
+    return get_work_areas_for_desktops(display, list(range(number_of_virtual_desktops)))
 
 
 def get_window_frame_extents(display, window) -> list[int] | None:
     extents = window.get_full_property(
-        display.intern_atom("_NET_FRAME_EXTENTS"), Xatom.CARDINAL
+        get_atom(display, "_NET_FRAME_EXTENTS"), Xatom.CARDINAL
     )
     return extents.value if extents != None else (0, 0, 0, 0)
 
 
-def get_window_coordinates(window) -> tuple[int, int] | None:
-    if window is None:
-        return None
+class WindowCoordinateResolver:
+    """
+    Resolves window coordinates relative to the root window
+
+    A window's frame (the top-level ancestor, as parented by the WM) and its
+    offset within that frame are cached once found, as is the position of the
+    frame itself. When tracking, frame positions are kept current from the
+    ConfigureNotify events of the root window (SubstructureNotifyMask), so
+    repeat lookups make no X requests at all, and ReparentNotify/DestroyNotify
+    drop cached frames. Without tracking, only the frame chain is cached and a
+    lookup costs a single TranslateCoords round-trip.
+
+    A frame resize can come with new decorations (a title bar toggled, borders
+    hidden when maximized) moving the client within the frame, so it drops the
+    frame position, and the next lookup translates the client offsets afresh.
+    Frames covering the whole root (virtual roots, which clients move within
+    without any ConfigureNotify from root) are never tracked.
+
+    handle_event() runs on the property monitor thread while lookups run on
+    the input thread, so lookups read every cache entry with a single get()
+    (an entry can disappear between a membership test and an index).
+    """
+
+    def __init__(self, display, root):
+        self.display = display
+        self.root = root
+        self.tracking = False
+        self.frames: dict[int, tuple[int, int, int]] = {}      # window -> (frame, x offset, y offset)
+        self.frame_positions: dict[int, tuple[int, int]] = {}  # frame -> (x, y)
+        self.frame_sizes: dict[int, tuple[int, int]] = {}      # frame -> (width, height)
+        self.virtual_roots: set[int] = set()
+
+    def invalidate(self, window_id: int):
+        self.frames.pop(window_id, None)
+        self.frame_positions.pop(window_id, None)
+        self.frame_sizes.pop(window_id, None)
+        self.virtual_roots.discard(window_id)
+
+    def handle_event(self, event):
+        if event.type == X.ConfigureNotify:
+            # Only root's children (frames) are reported, so the position is
+            # relative to root already, adjusted to the inside of the border
+            # as TranslateCoords would report it
+            frame_id = event.window.id
+            if frame_id not in self.frame_positions:
+                return
+            if self.frame_sizes.get(frame_id) != (event.width, event.height):
+                self.frame_positions.pop(frame_id, None)
+                self.frame_sizes.pop(frame_id, None)
+                return
+            self.frame_positions[frame_id] = (event.x + event.border_width, event.y + event.border_width)
+        elif event.type in (X.ReparentNotify, X.DestroyNotify):
+            self.invalidate(event.window.id)
+            for window_id in [w for w, (frame, _, _) in list(self.frames.items()) if frame == event.window.id]:
+                self.frames.pop(window_id, None)
+
+    def resolve(self, window) -> tuple[int, int] | None:
+        if window is None:
+            return None
+        return self.resolve_many([window])[0]
+
+    def resolve_many(self, windows: list) -> list[tuple[int, int] | None]:
+        window_ids = [window.id for window in windows]
+
+        unknown = [window_id for window_id in set(window_ids) if window_id not in self.frames]
+        if unknown:
+            self.find_frames(unknown)
+
+        # Windows or frames without a current position are translated together
+        untracked = set(window_ids) if not self.tracking else {
+            window_id for window_id, frame in zip(window_ids, map(self.frames.get, window_ids))
+            if frame is not None and frame[0] not in self.frame_positions
+        }
+        if untracked:
+            self.translate(untracked)
+
+        coordinates = []
+        for window_id in window_ids:
+            frame = self.frames.get(window_id)
+            frame_position = frame and self.frame_positions.get(frame[0])
+            if frame_position is None:
+                coordinates.append(None)
+                continue
+            _, x_offset, y_offset = frame
+            frame_x, frame_y = frame_position
+            coordinates.append((frame_x + x_offset, frame_y + y_offset))
+
+        if not self.tracking:
+            self.frame_positions.clear()
+        else:
+            for frame_id in list(self.virtual_roots):
+                self.frame_positions.pop(frame_id, None)
+
+        return coordinates
+
+    def find_frames(self, window_ids: list[int]):
+        # Walks every window up the tree at once, so the number of round-trips
+        # is the depth of the deepest window rather than the sum of all depths
+        pending = {window_id: window_id for window_id in window_ids}  # window -> current ancestor
+        while pending:
+            requests = [
+                request.QueryTree(display=self.display.display, defer=True, window=ancestor)
+                for ancestor in pending.values()
+            ]
+            for (window_id, ancestor), tree in zip(list(pending.items()), reply_all(requests)):
+                if tree is None or not tree.parent:
+                    del pending[window_id]
+                elif tree.parent.id == self.root.id:
+                    self.frames[window_id] = (ancestor, 0, 0)
+                    del pending[window_id]
+                else:
+                    pending[window_id] = tree.parent.id
+
+    def translate(self, window_ids: set[int]):
+        frames = {window_id: frame[0] for window_id in window_ids if (frame := self.frames.get(window_id)) is not None}
+        window_ids = list(frames)
+        frame_ids = list(set(frames.values()))
+        requests = [
+            request.TranslateCoords(display=self.display.display, defer=True, src_wid=wid, dst_wid=self.root.id, src_x=0, src_y=0)
+            for wid in window_ids + frame_ids
+        ]
+        if self.tracking and frame_ids:
+            # Frame (and root) sizes for ConfigureNotify to compare against, in
+            # the same round-trip
+            requests += [
+                request.GetGeometry(display=self.display.display, defer=True, drawable=drawable)
+                for drawable in frame_ids + [self.root.id]
+            ]
+        replies = reply_all(requests)
 
-    (x, y) = (0, 0)
+        translated_frames = replies[len(window_ids):len(window_ids) + len(frame_ids)]
+        for frame_id, translated in zip(frame_ids, translated_frames):
+            if translated is not None:
+                self.frame_positions[frame_id] = (translated.x, translated.y)
 
-    while window:
-        geometry = window.get_geometry()
-        x += geometry.x
-        y += geometry.y
-        window = window.query_tree().parent
+        if self.tracking and frame_ids:
+            *frame_geometries, root_geometry = replies[len(window_ids) + len(frame_ids):]
+            root_size = root_geometry and (root_geometry.width, root_geometry.height)
+            for frame_id, geometry in zip(frame_ids, frame_geometries):
+                if geometry is None:
+                    continue
+                self.frame_sizes[frame_id] = (geometry.width, geometry.height)
+                if (geometry.width, geometry.height) == root_size:
+                    self.virtual_roots.add(frame_id)
+                else:
+                    self.virtual_roots.discard(frame_id)
 
-    return (x, y)
+        for window_id, translated in zip(window_ids, replies[:len(window_ids)]):
+            frame = frames[window_id]
+            frame_position = self.frame_positions.get(frame)
+            if translated is None or frame_position is None:
+                self.invalidate(window_id)
+                continue
+            frame_x, frame_y = frame_position
+            self.frames[window_id] = (frame, translated.x - frame_x, translated.y - frame_y)
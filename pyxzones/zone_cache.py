@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+import os
+from dataclasses import astuple
+from pathlib import Path
+
+from . import config
+from .settings import SETTINGS
+from .types import MergeZone, WorkArea, Zone
+from .zone_profile import ZoneProfile
+
+"""
+
+Zone layouts (the zone and merge zone tables of every virtual desktop)
+persisted in the data directory, so a start on an already seen setup needs
+neither the monitor and work area queries nor the zone computation before the
+overlay can be set up
+
+Entries are keyed by a hash of the zone specification (the zones and merge
+zone settings) and a hash of the monitor topology and work areas they were
+computed from, most recently used first:
+
+    {"version": 1, "entries": [{"spec": ..., "topology": ..., "monitors": ...,
+                                "work_areas": ..., "zones": ..., "merge_zones": ...}]}
+
+At startup the most recent entry for the current zone specification is used
+as is (see load_latest_zone_profile()), the service then verifies it against
+the actual monitors and work areas in the background.
+
+"""
+
+CACHE_FILE = 'pyxzones-zones.json'
+FORMAT_VERSION = 1
+MAX_ENTRIES = 8
+
+
+def get_hash(value) -> str:
+    # Settings hold read-only mappings, which json only takes as dicts
+    data = json.dumps(value, default=dict, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+def get_spec_key() -> str:
+    return get_hash([SETTINGS.zones, SETTINGS.merge_zone_size_preference])
+
+
+def get_topology_key(monitors, work_areas) -> str:
+    return get_hash([monitors, [[astuple(work_area) for work_area in desktop] for desktop in work_areas]])
+
+
+def get_cache_file() -> Path | None:
+    data_directory = config.get_data_directory_path()
+    return Path(data_directory, CACHE_FILE) if data_directory is not None else None
+
+
+def read_entries(cache_file: Path | None) -> list[dict]:
+    if cache_file is None or not cache_file.exists():
+        return []
+    try:
+        with cache_file.open() as file:
+            cache = json.load(file)
+    except (OSError, ValueError) as exception:
+        logging.warning(f"Ignoring unreadable zone layout cache {cache_file}: {exception}")
+        return []
+    if type(cache) is not dict or cache.get('version') != FORMAT_VERSION:
+        logging.debug(f"Ignoring zone layout cache {cache_file} of another format version")
+        return []
+    entries = cache.get('entries', [])
+    if type(entries) is not list:
+        logging.warning(f"Ignoring malformed zone layout cache {cache_file}")
+        return []
+    return [entry for entry in entries if type(entry) is dict]
+
+
+def write_entries(cache_file: Path, entries: list[dict]):
+    # Written aside and renamed over, a reader never sees a partial file
+    temporary_file = cache_file.with_name(f".{cache_file.name}.{os.getpid()}")
+    try:
+        with temporary_file.open('w') as file:
+            json.dump({"version": FORMAT_VERSION, "entries": entries}, file, separators=(',', ':'))
+        os.replace(temporary_file, cache_file)
+    except OSError as exception:
+        logging.warning(f"Failed to write zone layout cache {cache_file}: {exception}")
+        temporary_file.unlink(missing_ok=True)
+
+
+def encode_merge_zone(merge_zone: MergeZone) -> list:
+    # [[x, y, width, height, orientation], [zone, ...], surface]
+    rectangle = (merge_zone.x, merge_zone.y, merge_zone.width, merge_zone.height, merge_zone.orientation)
+    return [rectangle, [astuple(zone) for zone in merge_zone.zones], astuple(merge_zone.surface)]
+
+
+def decode_merge_zone(value: list) -> MergeZone:
+    rectangle, zones, surface = value
+    return MergeZone(*rectangle, zones=tuple(Zone(*zone) for zone in zones), surface=Zone(*surface))
+
+
+def encode_profile(profile: ZoneProfile) -> dict:
+    return {
+        "monitors": profile.monitors,
+        "work_areas": [[astuple(work_area) for work_area in desktop] for desktop in profile.work_areas],
+        "zones": [[astuple(zone) for zone in desktop] for desktop in profile.zones],
+        "merge_zones": [
+            [encode_merge_zone(merge_zone) for merge_zone in desktop]
+            for desktop in profile.merge_zones
+        ],
+    }
+
+
+def decode_profile(entry: dict) -> ZoneProfile:
+    zones = [[Zone(*zone) for zone in desktop] for desktop in entry['zones']]
+    merge_zones = [
+        [decode_merge_zone(merge_zone) for merge_zone in desktop]
+        for desktop in entry['merge_zones']
+    ]
+    work_areas = [[WorkArea(*work_area) for work_area in desktop] for desktop in entry['work_areas']]
+    return ZoneProfile(zones, merge_zones, entry['monitors'], work_areas)
+
+
+def find_entry(entries: list[dict], spec: str, topology: str | None = None) -> dict | None:
+    for entry in entries:
+        if entry.get('spec') == spec and (topology is None or entry.get('topology') == topology):
+            return entry
+    return None
+
+
+def load_entry(entry: dict | None) -> ZoneProfile | None:
+    if entry is None:
+        return None
+    try:
+        return decode_profile(entry)
+    except (KeyError, TypeError, ValueError) as exception:
+        logging.warning(f"Ignoring malformed zone layout cache entry: {exception!r}")
+        return None
+
+
+def load_latest_zone_profile() -> ZoneProfile | None:
+    # The zones last used with the current zone specification, whatever the
+    # monitors and work areas are now
+    return load_entry(find_entry(read_entries(get_cache_file()), get_spec_key()))
+
+
+def load_zone_profile(monitors, work_areas) -> ZoneProfile | None:
+    return load_entry(find_entry(read_entries(get_cache_file()), get_spec_key(), get_topology_key(monitors, work_areas)))
+
+
+def save_zone_profile(profile: ZoneProfile):
+    cache_file = get_cache_file()
+    if cache_file is None:
+        return
+
+    spec = get_spec_key()
+    topology = get_topology_key(profile.monitors, profile.work_areas)
+    entries = read_entries(cache_file)
+    if entries and (entries[0].get('spec'), entries[0].get('topology')) == (spec, topology):
+        return
+
+    entry = {"spec": spec, "topology": topology, **encode_profile(profile)}
+    others = [other for other in entries if (other.get('spec'), other.get('topology')) != (spec, topology)]
+    write_entries(cache_file, [entry, *others][:MAX_ENTRIES])
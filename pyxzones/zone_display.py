@@ -1,15 +1,35 @@
+import cairo
 import gi
+import math
 import threading
+import time
+from typing import NamedTuple
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk
+from gi.repository import Gdk, Gtk
 
+from . import metrics
+from .metrics import timed
 from .settings import SETTINGS
-from .types import MergeZone, Zone
+from .types import MergeZone, WorkArea, Zone
+from .zone_layout import get_damage_padding, get_damaged_zones, get_hover_zones, get_zone_area, split_zones
+
+
+class ZoneSurfaces(NamedTuple):
+    # Pre-rendered overlay of every zone in its normal state, window sized
+    overlay: cairo.ImageSurface
+    # Per zone hover state tile (surface, window relative x, y), padded to
+    # include any border spilling outside of the zone
+    hover_tiles: dict[Zone, tuple[cairo.ImageSurface, int, int]]
 
 
 class ZoneDisplayWindow(Gtk.Window):
-    def __init__(self, screen_width, screen_height, zones):
+    """
+    Overlay covering a single work area (generally, one monitor's) and the
+    zones within it
+    """
+
+    def __init__(self, work_area: WorkArea, zones, persistent=False):
         super(ZoneDisplayWindow, self).__init__()
         self.screen = self.get_screen()
         self.visual = self.screen.get_rgba_visual()
@@ -18,65 +38,237 @@ class ZoneDisplayWindow(Gtk.Window):
         self.set_decorated(False)
         self.set_skip_taskbar_hint(True)
         self.set_position(Gtk.WindowPosition.NONE)
-        self.set_default_size(screen_width, screen_height)
-        self.set_size_request(screen_width, screen_height) # only way to force the larger size, classic hack
-        self.move(0, 0)
-        self.resize(screen_width, screen_height)
+        self.set_default_size(work_area.width, work_area.height)
+        self.work_area = None
+        self.set_work_area(work_area)
 
-        if self.visual != None and self.screen.is_composited():
+        # Shaped windows are opaque, only the zone pixels are part of the window
+        # (bounding shape), so they work (and cost next to nothing to keep up)
+        # without a compositor
+        composited = self.visual != None and self.screen.is_composited()
+        shaped_overlay = SETTINGS.snapshot.shaped_overlay
+        self.shaped = shaped_overlay == 'always' or (shaped_overlay == 'auto' and not composited)
+        self.composited = composited and not self.shaped
+        if self.composited:
             self.set_visual(self.visual)
 
         self.set_app_paintable(True)
         self.connect("draw", self.area_draw)
+        self.connect("configure-event", self.on_configure)
+        self.origin = (work_area.x, work_area.y)
 
-        self.zones = zones
-        self.hover_zone: Zone | MergeZone = None
+        self.zones = tuple(zones)
+        # Zones of this window to draw in their hover state
+        self.hover_zones: frozenset[Zone] = frozenset()
+
+        # Shaped windows only, see update_shape()
+        self.revealed = True
+        self.shape_dirty = True
+        self.base_shape_key = None
+        self.base_shape: cairo.Region = None
+
+        # Rendered zone surfaces, keyed by (zones, origin, size) so virtual
+        # desktops with identical zones share them
+        self.render_cache: dict[tuple, ZoneSurfaces] = {}
+        self.render_lock = threading.Lock()
+        self.prerender_layouts: list[tuple] = []
+
+        # Called after every draw, see ZoneDisplay.frame_drawn()
+        self.on_frame = None
+
+        self.load_settings()
+        if self.shaped:
+            self.update_shape(force=True)
+
+        self.persistent = persistent
+        if persistent:
+            # Mapped once and for all, never taking any input (empty input
+            # shape), and only ever revealed or concealed from then on
+            self.set_keep_above(True)
+            self.set_skip_pager_hint(True)
+            self.input_shape_combine_region(cairo.Region())
+            self.set_revealed(False)
+            self.show()
+
+    def set_revealed(self, revealed: bool):
+        # Opacity where there's a compositor to apply it, otherwise an empty
+        # bounding shape hides the window just as well
+        self.revealed = revealed
+        if self.shaped:
+            self.update_shape(force=True)
+        elif self.composited:
+            self.set_opacity(1.0 if revealed else 0.0)
+        else:
+            self.shape_combine_region(None if revealed else cairo.Region())
+
+    def get_zone_shape(self, zone: Zone, config, fill: bool) -> cairo.Region:
+        # Window relative region of the pixels draw_zone() paints for the zone:
+        # the border stroke (centered on the inset zone edge) and, if filled,
+        # the background
+        background_color, background_inset, border_color, border_thickness, border_inset = config
+        x = zone.x - self.origin[0]
+        y = zone.y - self.origin[1]
+        region = cairo.Region()
+
+        if fill:
+            region.union(cairo.RectangleInt(
+                x + background_inset, y + background_inset,
+                zone.width - background_inset * 2, zone.height - background_inset * 2
+            ))
+
+        if border_thickness > 0:
+            half = border_thickness / 2
+            left = math.floor(x + border_inset - half)
+            top = math.floor(y + border_inset - half)
+            right = math.ceil(x + zone.width - border_inset + half)
+            bottom = math.ceil(y + zone.height - border_inset + half)
+            ring = cairo.Region(cairo.RectangleInt(left, top, right - left, bottom - top))
+            inner_left = math.ceil(x + border_inset + half)
+            inner_top = math.ceil(y + border_inset + half)
+            inner_right = math.floor(x + zone.width - border_inset - half)
+            inner_bottom = math.floor(y + zone.height - border_inset - half)
+            if inner_right > inner_left and inner_bottom > inner_top:
+                ring.subtract(cairo.RectangleInt(inner_left, inner_top, inner_right - inner_left, inner_bottom - inner_top))
+            region.union(ring)
+
+        return region
+
+    def update_shape(self, force=False):
+        # The borders of every zone make up the base shape, kept until the zones
+        # or the window position change, the hover zones add their border and
+        # fill on top of it (normal zone fills are left out, an opaque fill
+        # would hide everything underneath)
+        if not force and not self.shape_dirty:
+            return
+        self.shape_dirty = False
+
+        if not self.revealed:
+            self.shape_combine_region(cairo.Region())
+            return
+
+        key = (self.zones, self.origin)
+        if key != self.base_shape_key:
+            self.base_shape = cairo.Region()
+            for zone in self.zones:
+                self.base_shape.union(self.get_zone_shape(zone, self.normal_zone_config, fill=False))
+            self.base_shape_key = key
+
+        region = self.base_shape.copy()
+        if SETTINGS.snapshot.highlight_hover_zone:
+            for zone in self.hover_zones:
+                if zone in self.zones:
+                    region.union(self.get_zone_shape(zone, self.hover_zone_config, fill=True))
+        self.shape_combine_region(region)
+
+    def set_hover_zones(self, hover_zones: frozenset[Zone]):
+        if hover_zones != self.hover_zones:
+            self.hover_zones = hover_zones
+            self.shape_dirty = True
+
+    def redraw_area(self, x, y, width, height):
+        # Must run on the GTK thread, after a hover change
+        if self.shaped:
+            self.update_shape()
+        self.queue_draw_area(x, y, width, height)
+
+    def load_settings(self):
+        settings = SETTINGS.snapshot
 
         # NOTE: Order matters here, expanded as function parameters below
         self.normal_zone_config = (
-            SETTINGS.zone_background_color,
-            SETTINGS.zone_background_inset,
-            SETTINGS.zone_border_color,
-            SETTINGS.zone_border_thickness,
-            SETTINGS.zone_border_inset
+            settings.zone_background_color,
+            settings.zone_background_inset,
+            settings.zone_border_color,
+            settings.zone_border_thickness,
+            settings.zone_border_inset
         )
         self.hover_zone_config = (
-            SETTINGS.hover_zone_background_color,
-            SETTINGS.hover_zone_background_inset,
-            SETTINGS.hover_zone_border_color,
-            SETTINGS.hover_zone_border_thickness,
-            SETTINGS.hover_zone_border_inset
+            settings.hover_zone_background_color,
+            settings.hover_zone_background_inset,
+            settings.hover_zone_border_color,
+            settings.hover_zone_border_thickness,
+            settings.hover_zone_border_inset
         )
 
-    def set_hover_zone(self, zone):
-        self.hover_zone = zone
+        self.damage_padding = get_damage_padding(settings)
+
+        self.base_shape_key = None
+        self.invalidate_render_cache()
+
+    def invalidate_render_cache(self):
+        with self.render_lock:
+            self.render_cache.clear()
+        self.prerender(self.prerender_layouts)
+
+    def prerender(self, layouts: list[tuple[tuple[Zone, ...], WorkArea]]):
+        # Rasterizes the given (zones, work area) layouts (generally, this
+        # window's share of every virtual desktop) off-thread, so drawing and
+        # desktop switches only have to blit
+        self.prerender_layouts = layouts
+        keys = [(zones, (work_area.x, work_area.y), (work_area.width, work_area.height)) for zones, work_area in layouts]
+
+        with self.render_lock:
+            keep = set(keys)
+            keep.add(self.get_render_key())
+            for key in [key for key in self.render_cache if key not in keep]:
+                del self.render_cache[key]
+
+        def render_all():
+            for key in keys:
+                self.get_zone_surfaces(*key)
+
+        if keys:
+            thread = threading.Thread(target=render_all)
+            thread.daemon = True
+            thread.start()
+
+    def get_render_key(self) -> tuple:
+        return (self.zones, self.origin, self.size)
+
+    def on_configure(self, widget, event):
+        # Cached here to save a get_position() round trip per zone drawn, see
+        # render_zones() for why the window position matters at all
+        position = self.get_position()
+        origin = (position.root_x, position.root_y)
+        if origin != self.origin:
+            self.origin = origin
+            if self.shaped:
+                self.update_shape(force=True)
+
+    def get_zone_area(self, zone: Zone) -> tuple[int, int, int, int]:
+        return get_zone_area(zone, self.origin, self.damage_padding)
+
+    def set_work_area(self, work_area: WorkArea):
+        if work_area == self.work_area:
+            return
+        self.work_area = work_area
+        self.size = (work_area.width, work_area.height)
+        self.set_size_request(work_area.width, work_area.height) # only way to force the larger size, classic hack
+        self.resize(work_area.width, work_area.height)
+        self.reset_position()
 
     def set_zones(self, zones):
-        self.zones = zones
+        self.zones = tuple(zones)
+        if self.shaped:
+            self.update_shape(force=True)
+        self.queue_draw()
 
     def reset_position(self):
-        self.move(0, 0)
+        self.move(self.work_area.x, self.work_area.y)
 
     def draw_zone(self, cr, zone: Zone, background_color, background_inset, border_color, border_thickness, border_inset):
-        # The WM can decide to respect or not the position request of 0, 0 and
-        # may adjust the position of the window based on panels present (some,
-        # none, or all panels...)
-        #
-        # While repeated calls to move(0, 0) may result in the display moving
-        # to the appropriate point, it may not be immediate and the user
-        # may see the window moving (can see this on current development env)
+        # Zones are drawn in root coordinates, callers translate the context
+        # to wherever the zone is meant to land on the target surface
         #
-        # So for now, consider new coordinates a forced workarea adjustment
-        # needed here
-        #
-        # The zones should already be adjusted for the appropriate workarea,
-        # just tweak relative positioning used here
-        window_coordinates = self.get_position()
+        # Shaped windows have no alpha channel, so colors are drawn opaque
+        if self.shaped:
+            background_color = (*background_color[:3], 1.0)
+            border_color = (*border_color[:3], 1.0)
 
         cr.set_source_rgba(*background_color)
         cr.rectangle(
-            zone.x + background_inset - window_coordinates.root_x,
-            zone.y + background_inset - window_coordinates.root_y,
+            zone.x + background_inset,
+            zone.y + background_inset,
             zone.width - background_inset * 2,
             zone.height - background_inset * 2
         )
@@ -85,29 +277,227 @@ class ZoneDisplayWindow(Gtk.Window):
         cr.set_source_rgba(*border_color)
         cr.set_line_width(border_thickness)
         cr.rectangle(
-            zone.x + border_inset - window_coordinates.root_x,
-            zone.y + border_inset - window_coordinates.root_y,
+            zone.x + border_inset,
+            zone.y + border_inset,
             zone.width - border_inset * 2,
             zone.height - border_inset * 2
         )
         cr.stroke()
 
+    def render_zones(self, zones: tuple[Zone, ...], origin: tuple[int, int], size: tuple[int, int]) -> ZoneSurfaces:
+        # The WM can decide to respect or not the position request (the work area origin) and
+        # may adjust the position of the window based on panels present (some,
+        # none, or all panels...)
+        #
+        # While repeated calls to reset_position() may result in the display moving
+        # to the appropriate point, it may not be immediate and the user
+        # may see the window moving (can see this on current development env)
+        #
+        # So for now, consider new coordinates a forced workarea adjustment
+        # needed here
+        #
+        # The zones should already be adjusted for the appropriate workarea,
+        # just tweak relative positioning used here
+        settings = SETTINGS.snapshot
+        overlay = cairo.ImageSurface(cairo.FORMAT_ARGB32, *size)
+        cr = cairo.Context(overlay)
+        cr.translate(-origin[0], -origin[1])
+        for zone in zones:
+            self.draw_zone(cr, zone, *self.normal_zone_config)
 
+        hover_tiles = {}
+        if settings.highlight_hover_zone:
+            padding = self.damage_padding
+            for zone in zones:
+                tile = cairo.ImageSurface(cairo.FORMAT_ARGB32, zone.width + padding * 2, zone.height + padding * 2)
+                cr = cairo.Context(tile)
+                cr.translate(-(zone.x - padding), -(zone.y - padding))
+                self.draw_zone(cr, zone, *self.hover_zone_config)
+                hover_tiles[zone] = (tile, zone.x - origin[0] - padding, zone.y - origin[1] - padding)
+
+        return ZoneSurfaces(overlay, hover_tiles)
+
+    def get_zone_surfaces(self, zones: tuple[Zone, ...], origin: tuple[int, int], size: tuple[int, int]) -> ZoneSurfaces:
+        with self.render_lock:
+            surfaces = self.render_cache.get((zones, origin, size))
+            if surfaces is None:
+                surfaces = self.render_zones(zones, origin, size)
+                self.render_cache[(zones, origin, size)] = surfaces
+            return surfaces
+
+    def draw_hover_tile(self, cr, zone: Zone, tile: cairo.ImageSurface, x: int, y: int):
+        padding = self.damage_padding
+        cr.save()
+        if self.composited:
+            # Inside the zone the hover state replaces the normal state...
+            cr.rectangle(x + padding, y + padding, zone.width, zone.height)
+            cr.clip()
+            cr.set_operator(cairo.OPERATOR_SOURCE)
+            cr.set_source_surface(tile, x, y)
+            cr.paint()
+            cr.restore()
+            cr.save()
+            # ...while border spilling outside of it is blended over neighbours
+            cr.set_fill_rule(cairo.FILL_RULE_EVEN_ODD)
+            cr.rectangle(x, y, zone.width + padding * 2, zone.height + padding * 2)
+            cr.rectangle(x + padding, y + padding, zone.width, zone.height)
+            cr.clip()
+        cr.set_source_surface(tile, x, y)
+        cr.paint()
+        cr.restore()
+
+    @timed('area_draw')
     def area_draw(self, widget, cr):
-        hover_zones = ()
-        if self.hover_zone:
-            hover_zones = self.hover_zone.zones if type(self.hover_zone) is MergeZone else (self.hover_zone,)
+        # Painting is limited to the damaged (clipped) areas by GTK, clearing
+        # whatever was previously drawn there first
+        if self.composited:
+            cr.set_operator(cairo.OPERATOR_SOURCE)
+            cr.set_source_rgba(0, 0, 0, 0)
+            cr.paint()
+            cr.set_operator(cairo.OPERATOR_OVER)
+
+        surfaces = self.get_zone_surfaces(*self.get_render_key())
+        cr.set_source_surface(surfaces.overlay, 0, 0)
+        cr.paint()
+
+        if SETTINGS.snapshot.highlight_hover_zone:
+            for zone in self.hover_zones:
+                if zone in surfaces.hover_tiles:
+                    self.draw_hover_tile(cr, zone, *surfaces.hover_tiles[zone])
+
+        if self.on_frame:
+            self.on_frame()
+
+
+class ZoneDisplay:
+    """
+    The zone overlay, made of one ZoneDisplayWindow per work area (generally,
+    per monitor) rather than a single window spanning the whole screen
+
+    Each window is only as large as its work area and only draws the zones
+    within it, so dead space between and around monitors is never allocated
+    or composited, and a hover change only repaints the window(s) it touches.
+
+    Persistent windows are mapped (and drawn) up front instead of on show(),
+    see ZoneDisplayWindow.set_revealed().
+    """
+
+    def __init__(self, work_areas: list[WorkArea], zones, persistent=False):
+        self.windows: list[ZoneDisplayWindow] = []
+        self.zone_windows: dict[Zone, ZoneDisplayWindow] = {}
+        self.hover_zone: Zone | MergeZone = None
+        self.shown = False
+        self.persistent = persistent
+        # Time (monotonic) of the activation being shown, until its first frame
+        self.activated_at: float | None = None
+        self.set_zones(zones, work_areas)
+
+    def set_zones(self, zones, work_areas: list[WorkArea]):
+        # Must run on the GTK thread, windows are added, removed and moved
+        split = split_zones(zones, work_areas)
+
+        while len(self.windows) < len(work_areas):
+            window = ZoneDisplayWindow(work_areas[len(self.windows)], (), self.persistent)
+            window.on_frame = self.frame_drawn
+            self.windows.append(window)
+        while len(self.windows) > len(work_areas):
+            self.windows.pop().destroy()
+
+        zone_windows = {}
+        for window, work_area, window_zones in zip(self.windows, work_areas, split):
+            window.set_work_area(work_area)
+            window.set_zones(window_zones)
+            zone_windows.update(dict.fromkeys(window_zones, window))
+        self.zone_windows = zone_windows
+
+        if self.shown:
+            self.show(self.activated_at)
+
+    def prerender(self, zone_lists, work_area_lists: list[list[WorkArea]]):
+        # Every window prerenders its share of every virtual desktop that has
+        # a work area for it
+        layouts = [[] for _ in self.windows]
+        for zones, work_areas in zip(zone_lists, work_area_lists):
+            for index, (window_zones, work_area) in enumerate(zip(split_zones(zones, work_areas), work_areas)):
+                if index < len(layouts):
+                    layouts[index].append((window_zones, work_area))
+
+        for window, window_layouts in zip(self.windows, layouts):
+            window.prerender(window_layouts)
+
+    def set_hover_zone(self, zone) -> list[tuple[ZoneDisplayWindow, tuple[int, int, int, int]]]:
+        # Returns the (window, window area) pairs needing a redraw (through
+        # ZoneDisplayWindow.redraw_area()), which is nothing unless the hover
+        # zone actually changed
+        if zone == self.hover_zone:
+            return []
+
+        damaged_zones = get_damaged_zones(self.hover_zone, zone)
+        hover_zones = get_hover_zones(zone)
+        self.hover_zone = zone
+
+        damaged_areas = []
+        for window in self.windows:
+            window.set_hover_zones(hover_zones)
+        for damaged_zone in damaged_zones:
+            window = self.zone_windows.get(damaged_zone)
+            if window:
+                damaged_areas.append((window, window.get_zone_area(damaged_zone)))
+        return damaged_areas
+
+    def reset_position(self):
+        for window in self.windows:
+            window.reset_position()
+
+    def load_settings(self):
+        # Must run on the GTK thread, after a settings reload
+        for window in self.windows:
+            window.load_settings()
+            if window.shaped:
+                window.update_shape(force=True)
+            window.queue_draw()
+
+    def show(self, activated_at: float | None = None):
+        self.shown = True
+        self.activated_at = activated_at
+        for window in self.windows:
+            if self.persistent:
+                window.set_revealed(bool(window.zones))
+            elif window.zones:
+                window.show()
+            else:
+                window.hide()
+
+        if self.persistent:
+            # Already drawn, the frame is up as soon as the server has it
+            Gdk.Display.get_default().flush()
+            self.frame_drawn()
+
+    def frame_drawn(self):
+        if self.activated_at is not None:
+            metrics.record('overlay_first_frame', time.monotonic() - self.activated_at)
+            self.activated_at = None
+
+    def hide(self):
+        self.shown = False
+        for window in self.windows:
+            if self.persistent:
+                window.set_revealed(False)
+            else:
+                window.hide()
+
 
-        for zone in self.zones:
-            hover_zone = SETTINGS.highlight_hover_zone and zone in hover_zones
-            self.draw_zone(cr, zone, *(self.normal_zone_config if not hover_zone else self.hover_zone_config))
+def setup_zone_display(work_areas: list[WorkArea], zones, threaded=True, persistent=False):
+    # Unless threaded, the caller is expected to run_zone_display() itself
+    zone_display = ZoneDisplay(work_areas, zones, persistent)
 
+    if threaded:
+        thread = threading.Thread(target=run_zone_display)
+        thread.daemon=True
+        thread.start()
 
-def setup_zone_display(x_screen_width, x_screen_height, zones):
-    zone_window = ZoneDisplayWindow(x_screen_width, x_screen_height, zones)
+    return zone_display
 
-    thread = threading.Thread(target=Gtk.main)
-    thread.daemon=True
-    thread.start()
 
-    return zone_window
+def run_zone_display():
+    Gtk.main()
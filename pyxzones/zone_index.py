@@ -0,0 +1,36 @@
+from bisect import bisect_right
+
+from .types import MergeZone, Zone
+
+
+class ZoneIndex:
+    """
+    Hit-testing index over the zones of a single virtual desktop
+
+    Every zone edge is collected into sorted x and y boundary tables, which
+    slices the desktop into a grid of cells where every point in a cell is
+    covered by exactly the same set of zones. The winning zone for each cell
+    is resolved once up front, so a lookup is two binary searches and a list
+    index rather than a scan over every zone.
+
+    Zones are given in priority order (merge zones first), and the first
+    zone covering a cell wins, mirroring the original linear scan.
+    """
+
+    def __init__(self, zones: list[Zone | MergeZone]):
+        # Zone.check() is inclusive of the far edge, so for integer pointer
+        # coordinates a zone covers the half-open span [x, x + width + 1)
+        self.x_bounds = sorted({edge for zone in zones for edge in (zone.x, zone.x + zone.width + 1)})
+        self.y_bounds = sorted({edge for zone in zones for edge in (zone.y, zone.y + zone.height + 1)})
+
+        self.cells = [
+            [next((zone for zone in zones if zone.check(x, y)), None) for x in self.x_bounds[:-1]]
+            for y in self.y_bounds[:-1]
+        ]
+
+    def find(self, x, y) -> MergeZone | Zone | None:
+        column = bisect_right(self.x_bounds, x) - 1
+        row = bisect_right(self.y_bounds, y) - 1
+        if column < 0 or row < 0 or column >= len(self.x_bounds) - 1 or row >= len(self.y_bounds) - 1:
+            return None
+        return self.cells[row][column]
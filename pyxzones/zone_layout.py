@@ -0,0 +1,53 @@
+import math
+
+from .settings import SettingsSnapshot
+from .types import MergeZone, WorkArea, Zone
+
+
+# How the zone overlay is laid out and damaged, kept apart from (and free of)
+# GTK so the session replay harness runs the very same code as ZoneDisplay
+
+
+def split_zones(zones, work_areas: list[WorkArea]) -> list[tuple[Zone, ...]]:
+    # Every zone goes to the work area its center is in (the first one, for
+    # zones somehow outside of all of them)
+    split = [[] for _ in work_areas]
+    for zone in zones:
+        center_x = zone.x + zone.width // 2
+        center_y = zone.y + zone.height // 2
+        index = next((
+            index for index, work_area in enumerate(work_areas)
+            if work_area.x <= center_x < work_area.x + work_area.width and work_area.y <= center_y < work_area.y + work_area.height
+        ), 0)
+        split[index].append(zone)
+    return [tuple(window_zones) for window_zones in split]
+
+
+def get_hover_zones(zone: Zone | MergeZone | None) -> frozenset[Zone]:
+    # Zones drawn in their hover state, a merge zone highlighting the zones it straddles
+    if not zone:
+        return frozenset()
+    return frozenset(zone.zones if type(zone) is MergeZone else (zone,))
+
+
+def get_damaged_zones(previous_zone: Zone | MergeZone | None, zone: Zone | MergeZone | None) -> frozenset[Zone]:
+    # Zones needing a redraw when the hover zone changes from previous_zone to zone
+    if zone == previous_zone:
+        return frozenset()
+    return get_hover_zones(previous_zone) | get_hover_zones(zone)
+
+
+def get_damage_padding(settings: SettingsSnapshot) -> int:
+    # Borders are stroked centered on the zone edge (less the inset), so
+    # up to half the thickness can spill outside of the zone rectangle
+    return math.ceil(max(settings.zone_border_thickness, settings.hover_zone_border_thickness) / 2) + 1
+
+
+def get_zone_area(zone: Zone, origin: tuple[int, int], padding: int) -> tuple[int, int, int, int]:
+    # Window relative (x, y, width, height) covering everything drawn for the zone
+    return (
+        zone.x - origin[0] - padding,
+        zone.y - origin[1] - padding,
+        zone.width + padding * 2,
+        zone.height + padding * 2
+    )
@@ -1,25 +1,68 @@
 import logging
 
+from .metrics import timed
 from .settings import SETTINGS
 from .types import MergeZone, Zone, WorkArea
+from .zone_index import ZoneIndex
+
+
+# Memoized results of the zone computations below, identical virtual desktops
+# (or a refresh that didn't change anything) share them
+MAX_CACHE_ENTRIES = 256
+ZONE_CACHE: dict[tuple, tuple[Zone, ...]] = {}
+MERGE_ZONE_CACHE: dict[tuple, tuple[MergeZone, ...]] = {}
+INDEX_CACHE: dict[tuple, ZoneIndex] = {}
+
+
+def clear_zone_caches():
+    ZONE_CACHE.clear()
+    MERGE_ZONE_CACHE.clear()
+    INDEX_CACHE.clear()
+
+
+def memoize(cache: dict, key: tuple, compute):
+    if key not in cache:
+        if len(cache) >= MAX_CACHE_ENTRIES:
+            cache.clear()
+        cache[key] = compute()
+    return cache[key]
 
 
 class ZoneProfile:
-    def __init__(self, zones, merge_zones):
+    def __init__(self, zones, merge_zones, monitors=None, work_areas=None):
         self.zones = zones
         self.merge_zones = merge_zones
+        # The monitors and work areas the zones were computed from
+        self.monitors = monitors
+        self.work_areas = work_areas
 
+        # Merge zones take priority over the zones they straddle, so they are
+        # indexed first (the index is only rebuilt with a new profile)
+        self.indexes = [
+            ZoneProfile.get_zone_index(merge_zones[desktop], zones[desktop]) for desktop in range(len(zones))
+        ]
+
+    @timed('find_zone')
     def find_zone(self, virtual_desktop, x, y) -> MergeZone | Zone | None:
-        for zone in self.merge_zones[virtual_desktop]:
-            if zone.check(x, y):
-                return zone
-        for zone in self.zones[virtual_desktop]:
-            if zone.check(x, y):
-                return zone
-        return None
+        return self.indexes[virtual_desktop].find(x, y)
+
+    @staticmethod
+    def get_zone_index(merge_zones, zones) -> ZoneIndex:
+        key = tuple(merge_zones) + tuple(zones)
+        return memoize(INDEX_CACHE, key, lambda: ZoneIndex(list(key)))
 
     @staticmethod
     def get_zones_for_monitor_work_area(monitor, work_area, zone_spec) -> list[Zone]:
+        key = (
+            monitor['width'], monitor['height'], work_area, zone_spec.get('orientation'),
+            tuple(zone_spec.get('columns', ())), tuple(zone_spec.get('rows', ()))
+        )
+        return list(memoize(ZONE_CACHE, key, lambda: tuple(
+            ZoneProfile.compute_zones_for_monitor_work_area(monitor, work_area, zone_spec)
+        )))
+
+    @staticmethod
+    def compute_zones_for_monitor_work_area(monitor, work_area, zone_spec) -> list[Zone]:
         zones = []
 
         # the crtc_info rotation is set differently in some environments than others
@@ -80,6 +123,13 @@ class ZoneProfile:
 
     @staticmethod
     def get_merge_zones_for_zones_work_area(zones: list[Zone], work_area: WorkArea) -> list[MergeZone]:
+        key = (tuple(zones), work_area, SETTINGS.merge_zone_size_preference)
+        return list(memoize(MERGE_ZONE_CACHE, key, lambda: tuple(
+            ZoneProfile.compute_merge_zones_for_zones_work_area(zones, work_area)
+        )))
+
+    @staticmethod
+    def compute_merge_zones_for_zones_work_area(zones: list[Zone], work_area: WorkArea) -> list[MergeZone]:
         merge_zones = []
         num_zones = len(zones)
 
@@ -119,37 +169,63 @@ class ZoneProfile:
         return merge_zones
 
 
+    @staticmethod
+    def get_zones_for_desktop(monitors, desktop_work_areas) -> tuple[list[Zone], list[MergeZone]]:
+        desktop_zones = []
+        desktop_merge_zones = []
+        zone_specification = SETTINGS.zones
+
+        single_workarea = len(desktop_work_areas) == 1
+        for monitor in range(len(monitors)):
+            work_area = desktop_work_areas[0] if single_workarea else desktop_work_areas[monitor]
+            monitor_zones = ZoneProfile.get_zones_for_monitor_work_area(
+                monitors[monitor],
+                work_area,
+                zone_specification['displays'][monitor]
+            )
+            desktop_zones += monitor_zones
+            desktop_merge_zones += ZoneProfile.get_merge_zones_for_zones_work_area(monitor_zones, work_area)
+
+        return desktop_zones, desktop_merge_zones
+
+    def with_desktops(self, work_areas: dict[int, list[WorkArea]]) -> 'ZoneProfile':
+        # A copy of this profile with only the given desktops recomputed (from
+        # their new work areas), every other desktop is carried over as is
+        zones = list(self.zones)
+        merge_zones = list(self.merge_zones)
+        all_work_areas = list(self.work_areas)
+
+        for desktop, desktop_work_areas in work_areas.items():
+            zones[desktop], merge_zones[desktop] = ZoneProfile.get_zones_for_desktop(self.monitors, desktop_work_areas)
+            all_work_areas[desktop] = desktop_work_areas
+
+            if logging.getLogger().isEnabledFor(logging.INFO):
+                logging.info(f"  zones for desktop {desktop}:")
+                for zone in zones[desktop]:
+                    logging.info(f"\t{zone=}")
+
+        return ZoneProfile(zones, merge_zones, self.monitors, all_work_areas)
+
     @staticmethod
     def get_zones_per_virtual_desktop(monitors, work_areas):
         zones = []         # [array of virtual desktops [of arrays of monitors [of array of zones]]]
         merge_zones = []
-        zone_specification = SETTINGS.zones
 
         for desktop in range(len(work_areas)):
-            desktop_zones = []
-            desktop_merge_zones = []
-            single_workarea = len(work_areas[desktop]) == 1
-            for monitor in range(len(monitors)):
-                work_area = work_areas[desktop][0] if single_workarea else work_areas[desktop][monitor]
-                monitor_zones = ZoneProfile.get_zones_for_monitor_work_area(
-                    monitors[monitor],
-                    work_area,
-                    zone_specification['displays'][monitor]
-                )
-                desktop_zones += monitor_zones
-                desktop_merge_zones += ZoneProfile.get_merge_zones_for_zones_work_area(monitor_zones, work_area)
-
+            desktop_zones, desktop_merge_zones = ZoneProfile.get_zones_for_desktop(monitors, work_areas[desktop])
             zones.append(desktop_zones)
             merge_zones.append(desktop_merge_zones)
 
 
-        logging.info("************************************************************")
-        logging.info("  zones:")
-        for desktop in range(0, len(zones)):
-            logging.info(f"  desktop {desktop}:")
-            for zone in zones[desktop]:
-                logging.info(f"\t{zone=}")
-        logging.info("************************************************************")
+        # Formatting every zone adds up with many desktops, so only when shown
+        if logging.getLogger().isEnabledFor(logging.INFO):
+            logging.info("************************************************************")
+            logging.info("  zones:")
+            for desktop in range(0, len(zones)):
+                logging.info(f"  desktop {desktop}:")
+                for zone in zones[desktop]:
+                    logging.info(f"\t{zone=}")
+            logging.info("************************************************************")
         """
         logging.info("************************************************************")
         logging.info("  merge_zones:")
@@ -160,5 +236,5 @@ class ZoneProfile:
         logging.info("************************************************************")
         """
 
-        return ZoneProfile(zones, merge_zones)
+        return ZoneProfile(zones, merge_zones, monitors, work_areas)
 
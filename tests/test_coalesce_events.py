@@ -0,0 +1,71 @@
+import pytest
+from Xlib import X
+
+from pyxzones.input_backend import InputEvent
+from pyxzones.service import Service
+from pyxzones.settings import SETTINGS, SettingsSnapshot
+
+
+class Scheduler:
+    # Records scheduled tasks instead of running them
+    def __init__(self):
+        self.scheduled = []
+
+    def schedule(self, key, delay, task):
+        self.scheduled.append((key, delay, task))
+
+
+@pytest.fixture
+def service():
+    # Only the input state coalesce_events() works with, as in
+    # benchmarks/replay_session.py
+    service = Service.__new__(Service)
+    service.scheduler = Scheduler()
+    service.setup_input_state()
+    return service
+
+
+@pytest.fixture
+def coalescing_interval(monkeypatch):
+    monkeypatch.setattr(SETTINGS, 'snapshot', SettingsSnapshot.compile({"motion_coalescing_interval": 1000}))
+
+
+def motion(x, y=0):
+    return InputEvent(X.MotionNotify, 0, x, y)
+
+
+def button(event_type):
+    return InputEvent(event_type, X.Button1, 0, 0)
+
+
+def describe(events):
+    return [(event.type, event.root_x) for event in events]
+
+
+def test_consecutive_motion_collapses_to_the_last(service):
+    events = [motion(1), motion(2), motion(3)]
+    assert list(service.coalesce_events(events)) == [events[-1]]
+
+
+def test_button_and_key_events_are_kept_in_order(service):
+    press = button(X.ButtonPress)
+    key = InputEvent(X.KeyPress, 64, 0, 0)
+    release = button(X.ButtonRelease)
+    events = [motion(1), press, motion(2), motion(3), key, motion(4), motion(5), release, motion(6)]
+
+    assert list(service.coalesce_events(events)) == [events[0], press, events[3], key, events[6], release, events[8]]
+    assert not service.scheduler.scheduled
+
+
+def test_held_back_motion_is_flushed_before_other_events(service, coalescing_interval):
+    assert describe(service.coalesce_events([motion(1)])) == [(X.MotionNotify, 1)]
+
+    # Within the interval the latest motion is held back, with a flush
+    # scheduled once for the trailing edge
+    assert describe(service.coalesce_events([motion(2), motion(3)])) == []
+    assert describe(service.coalesce_events([motion(4)])) == []
+    assert [key for key, _, _ in service.scheduler.scheduled] == ['motion_flush']
+
+    # A button release sees the final position first
+    assert describe(service.coalesce_events([button(X.ButtonRelease)])) == [(X.MotionNotify, 4), (X.ButtonRelease, 0)]
+    assert service.pending_motion_event is None
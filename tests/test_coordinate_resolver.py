@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pytest
+from Xlib import X
+
+from pyxzones.xq import WindowCoordinateResolver
+
+ROOT = 1
+FRAME = 10
+CLIENT = 11
+
+
+class Resolver(WindowCoordinateResolver):
+    # Tracking resolver whose X lookups are replaced by fixed answers: the
+    # client at (4, 20) within a 400x300 frame at (100, 50), on a 1920x1080 root
+    def __init__(self):
+        super().__init__(None, SimpleNamespace(id=ROOT))
+        self.tracking = True
+        self.translations = []
+        self.client_offset = (4, 20)
+        self.frame_size = (400, 300)
+
+    def find_frames(self, window_ids):
+        for window_id in window_ids:
+            self.frames[window_id] = (FRAME, 0, 0)
+
+    def translate(self, window_ids):
+        self.translations.append(set(window_ids))
+        self.frame_positions[FRAME] = (100, 50)
+        self.frame_sizes[FRAME] = self.frame_size
+        if self.frame_size == (1920, 1080):
+            self.virtual_roots.add(FRAME)
+        for window_id in window_ids:
+            self.frames[window_id] = (FRAME, *self.client_offset)
+
+
+def configure_notify(x, y, width, height, border_width=0):
+    return SimpleNamespace(type=X.ConfigureNotify, window=SimpleNamespace(id=FRAME), x=x, y=y, width=width, height=height, border_width=border_width)
+
+
+@pytest.fixture
+def resolver():
+    resolver = Resolver()
+    assert resolver.resolve(SimpleNamespace(id=CLIENT)) == (104, 70)
+    assert len(resolver.translations) == 1
+    return resolver
+
+
+def test_frame_moves_are_tracked_without_requests(resolver):
+    resolver.handle_event(configure_notify(300, 200, 400, 300, border_width=1))
+    assert resolver.resolve(SimpleNamespace(id=CLIENT)) == (305, 221)
+    assert len(resolver.translations) == 1
+
+
+def test_frame_resize_translates_the_client_offset_again(resolver):
+    # Borders hidden as the frame gets maximized
+    resolver.client_offset = (0, 0)
+    resolver.frame_size = (1920, 1040)
+    resolver.handle_event(configure_notify(0, 40, 1920, 1040))
+    assert resolver.resolve(SimpleNamespace(id=CLIENT)) == (100, 50)
+    assert resolver.translations == [{CLIENT}, {CLIENT}]
+
+    resolver.handle_event(configure_notify(0, 40, 1920, 1040))
+    assert resolver.resolve(SimpleNamespace(id=CLIENT)) == (0, 40)
+    assert len(resolver.translations) == 2
+
+
+def test_virtual_roots_are_not_tracked():
+    resolver = Resolver()
+    resolver.frame_size = (1920, 1080)
+    client = SimpleNamespace(id=CLIENT)
+    assert resolver.resolve(client) == (104, 70)
+    assert resolver.resolve(client) == (104, 70)
+    assert len(resolver.translations) == 2
+
+
+@pytest.mark.parametrize("event_type", [X.ReparentNotify, X.DestroyNotify])
+def test_reparented_or_destroyed_frames_are_dropped(resolver, event_type):
+    resolver.handle_event(SimpleNamespace(type=event_type, window=SimpleNamespace(id=FRAME)))
+    assert resolver.frames == {}
+    assert resolver.frame_positions == {}
+    assert resolver.frame_sizes == {}
@@ -0,0 +1,86 @@
+import random
+import struct
+
+import pytest
+from Xlib import X
+from Xlib.protocol import event, rq
+
+from pyxzones.input_backend import CORE_INPUT_EVENT_TYPES, InputEvent, decode_record_data
+
+
+class Display:
+    # Just enough of a display for Xlib to parse events with
+    event_classes = event.event_class.copy()
+
+    def get_resource_class(self, class_name, default=None):
+        return default
+
+
+def xlib_decode(data, display):
+    events = []
+    while len(data):
+        parsed, data = rq.EventField(None).parse_binary_value(data, display, None, None)
+        events.append(parsed)
+    return events
+
+
+def pack_core_event(rng, event_type):
+    # type, detail, sequence, time, root, event, child, root_x, root_y,
+    # event_x, event_y, state, same_screen
+    return struct.pack(
+        '=BBHIIIIhhhhHBx',
+        event_type, rng.randrange(256), rng.randrange(1 << 16), rng.randrange(1 << 32),
+        rng.randrange(1 << 29), rng.randrange(1 << 29), rng.randrange(1 << 29),
+        rng.randrange(-1 << 15, 1 << 15), rng.randrange(-1 << 15, 1 << 15),
+        rng.randrange(-1 << 15, 1 << 15), rng.randrange(-1 << 15, 1 << 15),
+        rng.randrange(1 << 16), rng.randrange(2)
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_core_events_match_xlib(seed):
+    rng = random.Random(seed)
+    display = Display()
+    # Every other event or so sent through SendEvent (top bit of the type)
+    data = b''.join(
+        pack_core_event(rng, rng.choice(sorted(CORE_INPUT_EVENT_TYPES)) | rng.choice((0, 0x80)))
+        for _ in range(200)
+    )
+
+    decoded = decode_record_data(data, display)
+    expected = xlib_decode(data, display)
+    assert len(decoded) == len(expected) == 200
+    for decoded_event, expected_event in zip(decoded, expected):
+        assert type(decoded_event) is InputEvent
+        assert (decoded_event.type, decoded_event.detail, decoded_event.root_x, decoded_event.root_y) == (
+            expected_event.type, expected_event.detail, expected_event.root_x, expected_event.root_y
+        )
+
+
+def test_other_events_fall_back_to_xlib():
+    rng = random.Random(0)
+    display = Display()
+    configure_notify = struct.pack(
+        '=BxHIIIhhHHHBx4x', X.ConfigureNotify | 0x80, 7, 0x100, 0x200, 0, -10, 20, 300, 400, 1, 0
+    )
+    # Not a core event at all (an extension's), parsed as AnyEvent
+    extension_event = bytes([90]) + bytes(rng.randrange(256) for _ in range(31))
+    data = pack_core_event(rng, X.MotionNotify) + configure_notify + extension_event
+
+    decoded = decode_record_data(data, display)
+    expected = xlib_decode(data, display)
+
+    assert type(decoded[0]) is InputEvent
+    for decoded_event, expected_event in zip(decoded[1:], expected[1:]):
+        assert type(decoded_event) is type(expected_event)
+        assert decoded_event._data == expected_event._data
+    assert decoded[1].type == X.ConfigureNotify
+    assert decoded[1].send_event
+    assert (decoded[1].x, decoded[1].y, decoded[1].width, decoded[1].height) == (-10, 20, 300, 400)
+    assert type(decoded[2]) is event.AnyEvent
+
+
+def test_trailing_partial_event_is_ignored():
+    rng = random.Random(0)
+    data = pack_core_event(rng, X.ButtonPress) + bytes(16)
+    assert [decoded.type for decoded in decode_record_data(data, Display())] == [X.ButtonPress]
@@ -0,0 +1,121 @@
+import threading
+import time
+
+from pyxzones.scheduler import DebounceScheduler
+
+# Generous upper bound for a task to run, assertions only ever wait for the
+# tasks themselves, never on the delays alone
+TIMEOUT = 5
+
+
+class Recorder:
+    # Task factory, recording (name, context, time run) and signalling each run
+    def __init__(self):
+        self.runs = []
+        self.ran = threading.Semaphore(0)
+
+    def task(self, name):
+        def run(context):
+            self.runs.append((name, context, time.monotonic()))
+            self.ran.release()
+        return run
+
+    def wait(self, count=1):
+        for _ in range(count):
+            assert self.ran.acquire(timeout=TIMEOUT)
+
+
+def wait_idle(scheduler):
+    # Pending tasks are taken off before running, so an empty pending map
+    # and a quiet moment mean nothing else is going to run
+    deadline = time.monotonic() + TIMEOUT
+    while scheduler.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+
+
+def test_burst_under_one_key_runs_the_last_task_once():
+    scheduler = DebounceScheduler()
+    recorder = Recorder()
+
+    for index in range(5):
+        scheduler.schedule('refresh', 0.05, recorder.task(index))
+    recorder.wait()
+    wait_idle(scheduler)
+
+    assert [name for name, _, _ in recorder.runs] == [4]
+    assert scheduler.counters['refresh_scheduled'] == 5
+    assert scheduler.counters['refresh_coalesced'] == 4
+    assert scheduler.counters['refresh_run'] == 1
+
+
+def test_rescheduling_pushes_the_deadline_back():
+    scheduler = DebounceScheduler()
+    recorder = Recorder()
+
+    start = time.monotonic()
+    scheduler.schedule('refresh', 0.1, recorder.task('first'))
+    time.sleep(0.05)
+    rescheduled_at = time.monotonic()
+    scheduler.schedule('refresh', 0.1, recorder.task('second'))
+    recorder.wait()
+
+    (name, _, ran_at), = recorder.runs
+    assert name == 'second'
+    assert ran_at - rescheduled_at >= 0.1
+    assert ran_at - start >= 0.15
+
+
+def test_independent_keys():
+    scheduler = DebounceScheduler()
+    recorder = Recorder()
+
+    scheduler.schedule('slow', 0.1, recorder.task('slow'))
+    scheduler.schedule('fast', 0, recorder.task('fast'))
+    scheduler.schedule('slow', 0.1, recorder.task('slow'))
+    recorder.wait(2)
+    wait_idle(scheduler)
+
+    assert [name for name, _, _ in recorder.runs] == ['fast', 'slow']
+    assert scheduler.counters['fast_run'] == 1
+    assert scheduler.counters['slow_run'] == 1
+    assert scheduler.counters['slow_coalesced'] == 1
+
+
+def test_cancel():
+    scheduler = DebounceScheduler()
+    recorder = Recorder()
+
+    scheduler.schedule('cancelled', 0.05, recorder.task('cancelled'))
+    scheduler.schedule('kept', 0.1, recorder.task('kept'))
+    scheduler.cancel('cancelled')
+    scheduler.cancel('never scheduled')
+    recorder.wait()
+    wait_idle(scheduler)
+
+    assert [name for name, _, _ in recorder.runs] == ['kept']
+
+
+def test_failing_task_recreates_the_context():
+    contexts = iter(range(100))
+    scheduler = DebounceScheduler(context_factory=lambda: next(contexts))
+    recorder = Recorder()
+
+    def failing_task(context):
+        recorder.runs.append(('failing', context, time.monotonic()))
+        recorder.ran.release()
+        raise RuntimeError("task failure")
+
+    scheduler.schedule('first', 0, recorder.task('first'))
+    recorder.wait()
+    scheduler.schedule('failing', 0, failing_task)
+    recorder.wait()
+    scheduler.schedule('after', 0, recorder.task('after'))
+    recorder.wait()
+
+    # The context is shared until a task fails, then created afresh
+    assert [(name, context) for name, context, _ in recorder.runs] == [('first', 0), ('failing', 0), ('after', 1)]
+    wait_idle(scheduler)
+    assert scheduler.counters['failing_failed'] == 1
+    assert scheduler.counters['failing_run'] == 0
+    assert scheduler.counters['after_run'] == 1
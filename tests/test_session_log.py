@@ -0,0 +1,49 @@
+import pytest
+
+from pyxzones.session_log import MAGIC, SessionLogError, SessionRecorder, read_session_header, read_session_records
+
+HEADER = {"min_keycode": 8, "keysyms": [0, 65513], "monitors": [], "work_areas": [[[0, 0, 1920, 1080]]]}
+RECORDS = [bytes(range(32)), bytes(64), b'\xff' * 32]
+
+
+def record_session(path):
+    recorder = SessionRecorder(path, HEADER)
+    for data in RECORDS:
+        recorder.write(data)
+    recorder.close()
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'session.pyxzses'
+    record_session(path)
+
+    with path.open('rb') as file:
+        assert read_session_header(file) == HEADER
+        records = list(read_session_records(file))
+
+    assert [data for _, data in records] == RECORDS
+    timestamps = [timestamp for timestamp, _ in records]
+    assert timestamps == sorted(timestamps)
+
+
+@pytest.mark.parametrize("cut", [1, 8, 12, 12 + 31])
+def test_truncated_final_record_ends_the_log(tmp_path, cut):
+    # Cut short inside the last record's timestamp, length, or data
+    path = tmp_path / 'session.pyxzses'
+    record_session(path)
+    data = path.read_bytes()
+    path.write_bytes(data[:len(data) - 12 - len(RECORDS[-1]) + cut])
+
+    with path.open('rb') as file:
+        assert read_session_header(file) == HEADER
+        assert [data for _, data in read_session_records(file)] == RECORDS[:-1]
+
+
+@pytest.mark.parametrize("magic", [b'PYXZSES2', b'\x00' * len(MAGIC), b'PYX'])
+def test_wrong_magic_or_version(tmp_path, magic):
+    path = tmp_path / 'session.pyxzses'
+    record_session(path)
+    path.write_bytes(magic + path.read_bytes()[len(MAGIC):])
+
+    with path.open('rb') as file, pytest.raises(SessionLogError):
+        read_session_header(file)
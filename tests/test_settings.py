@@ -0,0 +1,113 @@
+import io
+import json
+from dataclasses import FrozenInstanceError
+from types import MappingProxyType
+
+import pytest
+from Xlib import XK
+
+from pyxzones.settings import Settings, SettingsError, SettingsSnapshot
+
+
+def test_defaults():
+    snapshot = SettingsSnapshot.compile({})
+    assert snapshot == SettingsSnapshot()
+    assert snapshot.keybinding_keysyms == frozenset({XK.string_to_keysym('Alt_L')})
+    assert snapshot.keybinding_quick_shift_keysyms == frozenset({XK.string_to_keysym('Alt_L'), XK.string_to_keysym('Shift_L')})
+
+
+def test_coercion():
+    snapshot = SettingsSnapshot.compile({
+        "keybindings": ["Control_L", "Super_L"],
+        "zone_border_color": [0, 1, 0.5, 1],
+        "merge_zone_size_preference": 10,
+        "zone_border_thickness": 2,
+        "highlight_hover_zone": False,
+        "snap_basis_point": "window",
+        "zones": {"displays": [{"orientation": "portrait", "rows": [1, 2]}]},
+    })
+
+    assert snapshot.keybindings == ('Control_L', 'Super_L')
+    assert snapshot.keybinding_keysyms == frozenset(map(XK.string_to_keysym, ('Control_L', 'Super_L')))
+    assert snapshot.zone_border_color == (0.0, 1.0, 0.5, 1.0)
+    assert all(type(component) is float for component in snapshot.zone_border_color)
+    assert snapshot.merge_zone_size_preference == 10
+    assert snapshot.highlight_hover_zone is False
+    assert snapshot.snap_basis_point == 'window'
+
+    # json objects and lists are frozen
+    assert type(snapshot.zones) is MappingProxyType
+    assert snapshot.zones['displays'][0]['rows'] == (1, 2)
+    with pytest.raises(TypeError):
+        snapshot.zones['displays'] = ()
+
+
+def test_unknown_settings_are_ignored(caplog):
+    snapshot = SettingsSnapshot.compile({"no_such_setting": 1})
+    assert snapshot == SettingsSnapshot()
+    assert "no_such_setting" in caplog.text
+
+
+def test_snapshot_is_frozen():
+    snapshot = SettingsSnapshot()
+    with pytest.raises(FrozenInstanceError):
+        snapshot.highlight_hover_zone = False
+
+
+@pytest.mark.parametrize("user_configuration", [
+    [],
+    {"highlight_hover_zone": 1},
+    {"zone_border_thickness": "5"},
+    {"zone_border_thickness": True},
+    {"snap_basis_point": 1},
+    {"zone_border_color": [1, 1, 1]},
+    {"zone_border_color": [1, 1, 1, "1"]},
+    {"keybindings": "Alt_L"},
+    {"keybindings": ["Alt_L", 1]},
+    {"keybindings": ["NotAKey"]},
+    {"keybinding_quick_shift": ["Alt_L", "NotAKey"]},
+    {"zones": []},
+    {"snap_basis_point": "center"},
+    {"shaped_overlay": "sometimes"},
+    {"overlay_loading": "later"},
+    {"zones": {"displays": [{"orientation": "diagonal", "columns": [1]}]}},
+    {"zones": {"displays": [{"orientation": "landscape", "rows": [1, 2]}]}},
+    {"zones": {"displays": [{"orientation": "portrait", "rows": []}]}},
+    {"zones": {"displays": [{"orientation": "landscape", "columns": [1, 0]}]}},
+    {"zones": {"displays": [{"orientation": "landscape", "columns": [1, "2"]}]}},
+])
+def test_invalid_settings(user_configuration):
+    with pytest.raises(SettingsError):
+        SettingsSnapshot.compile(user_configuration)
+
+
+def test_settings_properties():
+    settings = Settings()
+    defaults = settings.snapshot
+
+    # Every snapshot field is readable from Settings, read-only
+    for name in SettingsSnapshot.__dataclass_fields__:
+        assert getattr(settings, name) == getattr(defaults, name)
+    with pytest.raises(AttributeError):
+        settings.highlight_hover_zone = False
+
+    settings.load({"highlight_hover_zone": False, "keybindings": ["Super_L"]})
+    assert settings.snapshot is not defaults
+    assert settings.highlight_hover_zone is False
+    assert settings.keybinding_keysyms == frozenset({XK.string_to_keysym('Super_L')})
+
+
+def test_failed_load_keeps_the_current_snapshot():
+    settings = Settings()
+    settings.load({"zone_border_thickness": 3})
+    snapshot = settings.snapshot
+
+    with pytest.raises(SettingsError):
+        settings.load({"zone_border_thickness": 3, "shaped_overlay": "sometimes"})
+    assert settings.snapshot is snapshot
+
+
+def test_load_from_file():
+    settings = Settings()
+    settings.load_from_file(io.StringIO(json.dumps({"overlay_loading": "first_use"})))
+    assert settings.overlay_loading == 'first_use'
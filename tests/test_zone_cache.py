@@ -0,0 +1,119 @@
+import json
+
+import pytest
+
+from pyxzones import zone_cache
+from pyxzones.types import WorkArea
+from pyxzones.zone_profile import ZoneProfile
+
+
+@pytest.fixture(autouse=True)
+def data_home(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_DATA_HOME', str(tmp_path))
+    return tmp_path
+
+
+def make_profile(width=1920):
+    # Two monitors, the second portrait, over two virtual desktops
+    monitors = [
+        {"virtual_x": 0, "virtual_y": 0, "width": width, "height": 1080},
+        {"virtual_x": width, "virtual_y": 0, "width": 1080, "height": 1920},
+    ]
+    work_areas = [
+        [WorkArea(0, 30, width, 1050), WorkArea(width, 0, 1080, 1920)],
+        [WorkArea(0, 0, width, 1080), WorkArea(width, 0, 1080, 1920)],
+    ]
+    return ZoneProfile.get_zones_per_virtual_desktop(monitors, work_areas)
+
+
+def assert_same_profile(loaded, profile):
+    assert loaded.monitors == profile.monitors
+    assert loaded.work_areas == profile.work_areas
+    assert loaded.zones == profile.zones
+    assert loaded.merge_zones == profile.merge_zones
+
+
+def test_get_cache_file(data_home):
+    assert zone_cache.get_cache_file() == data_home / zone_cache.CACHE_FILE
+
+
+def test_round_trip():
+    profile = make_profile()
+    assert any(profile.merge_zones)
+
+    loaded = zone_cache.decode_profile(json.loads(json.dumps(zone_cache.encode_profile(profile))))
+    assert_same_profile(loaded, profile)
+
+    zone_cache.save_zone_profile(profile)
+    assert_same_profile(zone_cache.load_zone_profile(profile.monitors, profile.work_areas), profile)
+    assert_same_profile(zone_cache.load_latest_zone_profile(), profile)
+
+    # Lookups go through the zone index like a freshly computed profile
+    assert zone_cache.load_latest_zone_profile().find_zone(0, 100, 100) == profile.find_zone(0, 100, 100)
+
+
+def test_miss_on_other_monitors_or_work_areas():
+    profile = make_profile()
+    zone_cache.save_zone_profile(profile)
+
+    other_monitors = make_profile(width=2560)
+    assert zone_cache.load_zone_profile(other_monitors.monitors, profile.work_areas) is None
+
+    other_work_areas = [[WorkArea(0, 0, 1920, 1080), WorkArea(1920, 0, 1080, 1920)]] * 2
+    assert zone_cache.load_zone_profile(profile.monitors, other_work_areas) is None
+
+    # The latest entry is used whatever the topology
+    assert_same_profile(zone_cache.load_latest_zone_profile(), profile)
+
+
+def test_most_recently_used_first_and_eviction():
+    profiles = [make_profile(width=1000 + 100 * index) for index in range(zone_cache.MAX_ENTRIES + 2)]
+    for profile in profiles:
+        zone_cache.save_zone_profile(profile)
+
+    entries = zone_cache.read_entries(zone_cache.get_cache_file())
+    assert len(entries) == zone_cache.MAX_ENTRIES
+    assert [entry['monitors'] for entry in entries] == [profile.monitors for profile in reversed(profiles[2:])]
+    assert zone_cache.load_zone_profile(profiles[0].monitors, profiles[0].work_areas) is None
+    assert zone_cache.load_zone_profile(profiles[1].monitors, profiles[1].work_areas) is None
+
+    # Saving a cached topology again moves it back to the front, once
+    zone_cache.save_zone_profile(profiles[2])
+    entries = zone_cache.read_entries(zone_cache.get_cache_file())
+    assert len(entries) == zone_cache.MAX_ENTRIES
+    assert entries[0]['monitors'] == profiles[2].monitors
+    assert [entry['monitors'] for entry in entries[1:]] == [profile.monitors for profile in reversed(profiles[3:])]
+    assert_same_profile(zone_cache.load_latest_zone_profile(), profiles[2])
+
+
+@pytest.mark.parametrize("content", [
+    "{not json",
+    "[]",
+    json.dumps({"version": zone_cache.FORMAT_VERSION + 1, "entries": []}),
+    json.dumps({"entries": []}),
+    json.dumps({"version": zone_cache.FORMAT_VERSION, "entries": "not a list"}),
+    json.dumps({"version": zone_cache.FORMAT_VERSION, "entries": [1, None]}),
+])
+def test_unreadable_or_other_version_cache_is_ignored(content):
+    profile = make_profile()
+    cache_file = zone_cache.get_cache_file()
+    cache_file.write_text(content)
+
+    assert zone_cache.load_latest_zone_profile() is None
+    assert zone_cache.load_zone_profile(profile.monitors, profile.work_areas) is None
+
+    # and replaced on the next save
+    zone_cache.save_zone_profile(profile)
+    assert_same_profile(zone_cache.load_latest_zone_profile(), profile)
+
+
+def test_malformed_entry_is_ignored():
+    profile = make_profile()
+    zone_cache.save_zone_profile(profile)
+    cache_file = zone_cache.get_cache_file()
+    cache = json.loads(cache_file.read_text())
+    cache['entries'][0]['zones'] = [[["not", "a", "zone"]]]
+    cache_file.write_text(json.dumps(cache))
+
+    assert zone_cache.load_latest_zone_profile() is None
+    assert zone_cache.load_zone_profile(profile.monitors, profile.work_areas) is None
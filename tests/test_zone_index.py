@@ -0,0 +1,107 @@
+import itertools
+
+from pyxzones.types import MergeZone, WorkArea, Zone
+from pyxzones.zone_index import ZoneIndex
+from pyxzones.zone_profile import ZoneProfile
+
+
+def linear_find(zones, x, y):
+    # The scan ZoneIndex replaces: first zone (in priority order) covering the point
+    return next((zone for zone in zones if zone.check(x, y)), None)
+
+
+def assert_matches_linear_scan(zones, xs, ys):
+    index = ZoneIndex(zones)
+    for x, y in itertools.product(xs, ys):
+        assert index.find(x, y) == linear_find(zones, x, y), (x, y)
+
+
+def around(*edges):
+    # Every edge, and the pixels either side of it
+    return sorted({edge + offset for edge in edges for offset in (-1, 0, 1)})
+
+
+def test_empty():
+    index = ZoneIndex([])
+    assert index.find(0, 0) is None
+
+
+def test_shared_edge_goes_to_the_first_zone():
+    left = Zone(0, 0, 100, 100, 'landscape')
+    right = Zone(100, 0, 100, 100, 'landscape')
+    index = ZoneIndex([left, right])
+
+    # Zone.check() includes the far edge, so x=100 is covered by both
+    assert index.find(100, 50) is left
+    assert index.find(101, 50) is right
+    assert index.find(200, 100) is right
+    assert index.find(201, 50) is None
+    assert_matches_linear_scan([left, right], around(0, 100, 200), around(0, 100))
+    assert_matches_linear_scan([right, left], around(0, 100, 200), around(0, 100))
+
+
+def test_gaps_between_zones():
+    zones = [Zone(0, 0, 100, 100, 'landscape'), Zone(300, 50, 100, 200, 'portrait')]
+    index = ZoneIndex(zones)
+
+    assert index.find(200, 50) is None
+    assert index.find(350, 20) is None
+    assert index.find(-1, 0) is None
+    assert_matches_linear_scan(zones, around(0, 100, 300, 400), around(0, 50, 100, 250))
+
+
+def test_negative_offsets():
+    zones = [Zone(-1920, -200, 960, 1080, 'landscape'), Zone(-960, -200, 960, 1080, 'landscape'), Zone(0, 0, 1920, 1080, 'landscape')]
+    index = ZoneIndex(zones)
+
+    assert index.find(-1920, -200) is zones[0]
+    assert index.find(-1921, -200) is None
+    assert index.find(-500, 800) is zones[1]
+    assert index.find(0, -1) is zones[1]
+    assert index.find(0, 0) is zones[1]
+    assert index.find(1, 0) is zones[2]
+    assert_matches_linear_scan(zones, around(-1920, -960, 0, 1920), around(-200, 0, 880, 1080))
+
+
+def test_overlapping_merge_zones_take_priority():
+    left = Zone(0, 0, 100, 100, 'landscape')
+    right = Zone(100, 0, 100, 100, 'landscape')
+    merge_zone = MergeZone(90, 0, 20, 100, 'landscape', zones=(left, right), surface=Zone(0, 0, 200, 100, 'landscape'))
+    zones = [merge_zone, left, right]
+    index = ZoneIndex(zones)
+
+    assert index.find(89, 50) is left
+    assert index.find(90, 50) is merge_zone
+    assert index.find(110, 50) is merge_zone
+    assert index.find(111, 50) is right
+    assert_matches_linear_scan(zones, around(0, 90, 100, 110, 200), around(0, 100))
+
+
+def test_multi_monitor_profile():
+    # Landscape monitor left of a portrait one, offset down, with a panel
+    # taking the top of the first work area
+    monitors = [
+        {"virtual_x": 0, "virtual_y": 0, "width": 1920, "height": 1080},
+        {"virtual_x": 1920, "virtual_y": 300, "width": 1080, "height": 1920},
+    ]
+    work_areas = [[WorkArea(0, 30, 1920, 1050), WorkArea(1920, 300, 1080, 1920)]]
+    profile = ZoneProfile.get_zones_per_virtual_desktop(monitors, work_areas)
+    zones = profile.merge_zones[0] + profile.zones[0]
+
+    xs = around(*{edge for zone in zones for edge in (zone.x, zone.x + zone.width)}, 3000)
+    ys = around(*{edge for zone in zones for edge in (zone.y, zone.y + zone.height)}, 0)
+    assert_matches_linear_scan(zones, xs, ys)
+
+    for x, y in itertools.product(xs, ys):
+        assert profile.find_zone(0, x, y) == linear_find(zones, x, y), (x, y)
+
+
+def test_sampled_grid_matches_linear_scan():
+    zones = [
+        Zone(x, y, width, height, 'landscape')
+        for x, y, width, height in (
+            (0, 0, 640, 480), (640, 0, 640, 480), (0, 480, 1280, 240),
+            (1400, -100, 300, 900), (1500, 200, 50, 50), (-300, 700, 400, 100),
+        )
+    ]
+    assert_matches_linear_scan(zones, range(-320, 1720, 7), range(-120, 820, 7))
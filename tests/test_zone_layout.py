@@ -0,0 +1,35 @@
+from pyxzones.settings import SettingsSnapshot
+from pyxzones.types import MergeZone, WorkArea, Zone
+from pyxzones.zone_layout import get_damage_padding, get_damaged_zones, get_zone_area, split_zones
+
+
+def test_split_zones_by_center():
+    work_areas = [WorkArea(0, 0, 1920, 1080), WorkArea(1920, 0, 1080, 1920)]
+    left = Zone(0, 0, 1920, 1080, 'landscape')
+    right = Zone(1920, 0, 1080, 1920, 'portrait')
+    # Mostly on the second work area, so it goes there
+    straddling = Zone(1800, 0, 400, 100, 'landscape')
+    outside = Zone(5000, 5000, 10, 10, 'landscape')
+
+    assert split_zones([left, right, straddling, outside], work_areas) == [(left, outside), (right, straddling)]
+
+
+def test_damaged_zones():
+    left = Zone(0, 0, 100, 100, 'landscape')
+    right = Zone(100, 0, 100, 100, 'landscape')
+    other = Zone(0, 100, 200, 100, 'landscape')
+    merge_zone = MergeZone(90, 0, 20, 100, 'landscape', zones=(left, right), surface=Zone(0, 0, 200, 100, 'landscape'))
+
+    assert get_damaged_zones(None, None) == frozenset()
+    assert get_damaged_zones(left, left) == frozenset()
+    assert get_damaged_zones(None, left) == {left}
+    assert get_damaged_zones(left, other) == {left, other}
+    assert get_damaged_zones(other, merge_zone) == {left, right, other}
+    assert get_damaged_zones(merge_zone, None) == {left, right}
+
+
+def test_zone_area():
+    settings = SettingsSnapshot.compile({"zone_border_thickness": 3, "hover_zone_border_thickness": 6})
+    padding = get_damage_padding(settings)
+    assert padding == 4
+    assert get_zone_area(Zone(1930, 40, 100, 50, 'landscape'), (1920, 30), padding) == (6, 6, 108, 58)